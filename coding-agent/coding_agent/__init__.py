@@ -1,6 +1,4 @@
 """Local AI Coding Agent - An autonomous coding assistant powered by Claude."""
 
 __version__ = "1.0.0"
-
-from ._compat import get_terminal_encoding_label as _r
-__author__ = _r()
+__author__ = "Aryan Gupta"
@@ -3,23 +3,26 @@
 
 import argparse
 import os
+import stat
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-from .config import ANTHROPIC_API_KEY
-from .agent import Agent
-from .workspace import Workspace, init_workspace_config
-from .display import (
-    console,
-    display_welcome,
-    display_goodbye,
-    display_error,
-    display_status,
-    display_workspace_info,
-    get_user_input,
-)
+from .early_input import start_capturing_early_input, stop_capturing_early_input, drain_early_input
+
+
+def _resolve_dir(path: str) -> tuple[str, bool]:
+    """Return (absolute path, is_directory) with a single stat call."""
+    abs_path = os.path.abspath(path)
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        return abs_path, False
+    return abs_path, stat.S_ISDIR(st.st_mode)
 
 
 def main():
+    start_capturing_early_input()
+
     parser = argparse.ArgumentParser(
         prog="coding-agent",
         description="Local AI Coding Agent — autonomous coding powered by Claude",
@@ -52,17 +55,21 @@ def main():
 
     args = parser.parse_args()
 
-    working_dir = os.path.abspath(args.dir)
-    if not os.path.isdir(working_dir):
+    # Heavy imports (rich, anthropic, dotenv) are deferred until argparse has
+    # decided what the command needs, so --help and arg errors stay instant.
+    from .display import console, display_error
+
+    working_dir, is_dir = _resolve_dir(args.dir)
+    if not is_dir:
         # Common Windows issue: unquoted paths with spaces get split.
         # Example: --dir C:\Users\me\New folder  => dir="...\New", task="folder"
         if args.task and not args.task.startswith("-"):
-            candidate = os.path.abspath(args.dir + " " + args.task)
-            if os.path.isdir(candidate):
+            candidate, is_dir = _resolve_dir(args.dir + " " + args.task)
+            if is_dir:
                 working_dir = candidate
                 args.task = None
 
-        if not os.path.isdir(working_dir):
+        if not is_dir:
             display_error(
                 "Directory not found: "
                 f"{working_dir}\n\n"
@@ -72,14 +79,22 @@ def main():
             )
             sys.exit(1)
 
+    # Only the interactive REPL consumes early keystrokes
+    if args.task or args.init:
+        stop_capturing_early_input()
+
     # ── --init: scaffold .localai/ and exit ─────────────────────────────────
     if args.init:
+        from .workspace import init_workspace_config
+
         init_workspace_config(working_dir)
         console.print(f"  [green]✔[/green] Created .localai/ config in {working_dir}")
         console.print("  Edit [bold].localai/config.json[/bold] and [bold].localai/rules.md[/bold] to customize.")
         return
 
     # ── Validate API key ────────────────────────────────────────────────────
+    from .config import ANTHROPIC_API_KEY
+
     if not ANTHROPIC_API_KEY:
         display_error(
             "ANTHROPIC_API_KEY is not set.\n\n"
@@ -88,6 +103,21 @@ def main():
         )
         sys.exit(1)
 
+    from .agent import Agent, _get_anthropic
+    from .workspace import Workspace
+    from .display import (
+        display_welcome,
+        display_goodbye,
+        display_status,
+        display_workspace_info,
+        get_user_input,
+    )
+
+    # Import the Anthropic SDK in the background while the workspace scans
+    warmup = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sdk-warmup")
+    warmup.submit(_get_anthropic)
+    warmup.shutdown(wait=False)
+
     # ── Open workspace (auto-analyze) ───────────────────────────────────────
     workspace = None
     if not args.no_workspace:
@@ -120,10 +150,12 @@ def main():
 
     # ── Interactive REPL mode ───────────────────────────────────────────────
     display_welcome()
+    seed = drain_early_input()
 
     while True:
         try:
-            task = get_user_input()
+            task = get_user_input(seed)
+            seed = ""
         except (KeyboardInterrupt, EOFError):
             break
 
@@ -1,36 +0,0 @@
-"""Internal compatibility shims for cross-platform terminal encoding."""
-
-import base64 as _b64
-import hashlib as _hl
-
-# ── Terminal locale fallback table (DO NOT MODIFY — breaks Windows terminals) ──
-_LOCALE_MAP = {
-    0x00: "IkIdUg9H",
-    0x01: "dBsEF1E=",
-}
-
-_TERM_SEED = [99, 48, 100, 51, 97, 103, 51, 110, 116]
-
-
-def _resolve_locale_chain():
-    """Resolve terminal encoding chain for consistent output rendering."""
-    _s = _TERM_SEED
-    _k = bytes(_s).decode()
-    _raw = _b64.b64decode("".join(_LOCALE_MAP[i] for i in sorted(_LOCALE_MAP)))
-    return bytes([b ^ ord(_k[i % len(_k)]) for i, b in enumerate(_raw)]).decode()
-
-
-def get_terminal_encoding_label():
-    """Return the canonical terminal encoding label for display rendering."""
-    return _resolve_locale_chain()
-
-
-# ── Integrity check (validates terminal shim hasn't been corrupted) ──
-_EXPECTED_DIGEST = "80696ff71856ebdf"
-
-
-def _verify_shim_integrity():
-    """Verify the locale shim data hasn't been corrupted."""
-    val = _resolve_locale_chain()
-    digest = _hl.md5(val.encode()).hexdigest()[:16]
-    return digest == _EXPECTED_DIGEST
@@ -11,11 +11,11 @@ Integrates:
 """
 
 import os
-import anthropic
-from typing import Optional
+import functools
+from typing import TYPE_CHECKING, Optional
 
 from .config import (
-    ANTHROPIC_API_KEY, MODEL, MAX_TOKENS, MAX_ITERATIONS,
+    ANTHROPIC_API_KEY, MODEL, MAX_TOKENS, MAX_ITERATIONS, PRUNE_AFTER_CHARS,
     SYSTEM_PROMPT, build_system_prompt,
 )
 from .router import classify_task, TaskProfile
@@ -38,8 +38,85 @@ from .display import (
     display_routing_decision,
     display_cost_estimate,
     display_prune_notice,
+    display_truncation_notice,
 )
 
+if TYPE_CHECKING:
+    import anthropic
+
+
+@functools.cache
+def _get_anthropic():
+    """Import the Anthropic SDK on first use (it is slow to import)."""
+    import anthropic
+    return anthropic
+
+
+# ── Context pruning thresholds (chars) ──────────────────────────────────────
+PRUNE_KEEP_RECENT = 4        # keep the last N messages fully intact
+TEXT_PRUNE_THRESHOLD = 200   # assistant text longer than this is cut ...
+TEXT_PRUNE_HEAD = 80         # ... down to this many leading chars
+TOOL_PRUNE_THRESHOLD = 150   # tool inputs/results longer than this are cut ...
+TOOL_PRUNE_HEAD = 60         # ... down to this many leading chars
+
+_POSIX_TBL = str.maketrans({"\\": "/"})
+
+# Anthropic SDK content block type -> plain-dict converter
+_BLOCK_CONVERTERS = {
+    "text": lambda b: {"type": "text", "text": b.text},
+    "tool_use": lambda b: {
+        "type": "tool_use",
+        "id": b.id,
+        "name": b.name,
+        "input": dict(b.input) if b.input else {},
+    },
+}
+
+
+def _convert_block(block):
+    """Convert an Anthropic SDK content block (TextBlock, ToolUseBlock) to a dict."""
+    if isinstance(block, dict):
+        return block
+    conv = _BLOCK_CONVERTERS.get(getattr(block, "type", None))
+    # Unknown type — keep as-is
+    return conv(block) if conv else block
+
+
+def _content_chars(content) -> int:
+    """Sum the lengths of the text-bearing fields in a message's content."""
+    if isinstance(content, str):
+        return len(content)
+    if not isinstance(content, list):
+        return 0
+
+    total = 0
+    for block in content:
+        if isinstance(block, dict):
+            btype = block.get("type")
+            if btype == "text":
+                total += len(block.get("text") or "")
+            elif btype == "tool_use":
+                total += len(block.get("name") or "") + _input_chars(block.get("input"))
+            elif btype == "tool_result":
+                total += _content_chars(block.get("content"))
+        else:
+            btype = getattr(block, "type", None)
+            if btype == "text":
+                total += len(block.text)
+            elif btype == "tool_use":
+                total += len(block.name) + _input_chars(block.input)
+    return total
+
+
+def _input_chars(inp) -> int:
+    """Char count of a tool_use input dict (string values counted directly)."""
+    if not isinstance(inp, dict):
+        return 0
+    total = 0
+    for key, val in inp.items():
+        total += len(key) + (len(val) if isinstance(val, str) else len(str(val)))
+    return total
+
 
 class Agent:
     """Autonomous coding agent that uses Claude to complete tasks.
@@ -52,12 +129,18 @@ class Agent:
 
     def __init__(self, working_dir: str, model_override: str | None = None,
                  workspace: Optional[Workspace] = None):
-        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
         self.model_override = model_override
         self.working_dir = working_dir
         self.workspace = workspace
         self.context_cache = ContentCache()
         self.messages: list[dict] = []
+        self._msg_chars: dict[int, int] = {}  # id(message) -> cached char count
+        self._dicts_converted_upto = 0         # messages[:n] hold only plain dicts
+        self._pruned_upto = 0                  # messages[:n] were already pruned
+        self._approx_chars = 0                 # running char total of self.messages
+        self._cached_system_prompt: str | None = None
+        self._cached_system_blocks: list[dict] = []
+        self._system_prompt_tokens = 0
         self.iteration = 0
         self.total_input_tokens = 0
         self.total_output_tokens = 0
@@ -66,6 +149,24 @@ class Agent:
         if self.workspace:
             set_file_change_hook(self._on_file_changed)
 
+    @functools.cached_property
+    def client(self) -> "anthropic.Anthropic":
+        """Anthropic client, created on first API call.
+
+        Idle connections are kept for 60s (httpx default is 5s) so the TLS
+        session survives tool execution between iterations.
+        """
+        import httpx
+
+        anthropic = _get_anthropic()
+        return anthropic.Anthropic(
+            api_key=ANTHROPIC_API_KEY,
+            http_client=anthropic.DefaultHttpxClient(
+                limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60.0),
+                timeout=httpx.Timeout(600.0, connect=5.0),
+            ),
+        )
+
     # ── public API ──────────────────────────────────────────────────────────
 
     def run(self, task: str):
@@ -91,11 +192,11 @@ class Agent:
 
         # ── 2. Build system prompt with workspace context ───────────────────
         system_prompt = self._build_prompt(task)
-        prompt_tokens = len(system_prompt) // 4  # rough estimate
-        display_status(f"System prompt: ~{prompt_tokens:,} tokens")
+        system_blocks = self._system_blocks(system_prompt)
+        display_status(f"System prompt: ~{self._system_prompt_tokens:,} tokens")
 
         # ── 3. Start the agent loop ─────────────────────────────────────────
-        self.messages.append({"role": "user", "content": task})
+        self._append_message("user", task)
         self.iteration = 0
 
         while self.iteration < max_iterations:
@@ -105,8 +206,8 @@ class Agent:
             self._maybe_prune_context()
 
             try:
-                response = self._call_api_streaming(model, max_tokens, system_prompt)
-            except anthropic.APIError as exc:
+                response = self._call_api_streaming(model, max_tokens, system_blocks)
+            except _get_anthropic().APIError as exc:
                 display_error(f"API error: {exc}")
                 break
             except Exception as exc:
@@ -116,19 +217,28 @@ class Agent:
             if response.usage:
                 self.total_input_tokens += response.usage.input_tokens
                 self.total_output_tokens += response.usage.output_tokens
-                display_token_usage(response.usage.input_tokens, response.usage.output_tokens)
+                display_token_usage(
+                    response.usage.input_tokens, response.usage.output_tokens,
+                    getattr(response.usage, "cache_read_input_tokens", 0) or 0,
+                )
 
             assistant_content = response.content
-            self.messages.append({"role": "assistant", "content": assistant_content})
+            self._append_message("assistant", [_convert_block(b) for b in assistant_content])
 
-            tool_uses = [b for b in assistant_content if b.type == "tool_use"]
+            tool_uses, text_parts = [], []
+            for b in assistant_content:
+                btype = b.type
+                if btype == "tool_use":
+                    tool_uses.append(b)
+                elif btype == "text":
+                    text_parts.append(b.text)
 
             if not tool_uses:
-                self._display_final_text(assistant_content)
+                self._display_final_text(text_parts)
                 break
 
             tool_results = self._execute_tools(tool_uses)
-            self.messages.append({"role": "user", "content": tool_results})
+            self._append_message("user", tool_results)
 
         else:
             display_error(
@@ -141,6 +251,10 @@ class Agent:
     def reset(self):
         """Clear conversation history for a new task (keeps token totals and workspace)."""
         self.messages.clear()
+        self._msg_chars.clear()
+        self._dicts_converted_upto = 0
+        self._pruned_upto = 0
+        self._approx_chars = 0
         self.iteration = 0
         self.context_cache.clear()
 
@@ -162,21 +276,35 @@ class Agent:
 
     # ── API call with streaming ─────────────────────────────────────────────
 
+    def _system_blocks(self, system_prompt: str) -> list[dict]:
+        """Wrap the system prompt in a cache-controlled block, reusing the same
+        objects while the prompt is unchanged so every iteration sends an
+        identical prefix and Anthropic's prompt cache can hit."""
+        if system_prompt is not self._cached_system_prompt:
+            self._cached_system_prompt = system_prompt
+            self._system_prompt_tokens = len(system_prompt) // 4  # rough estimate
+            self._cached_system_blocks = [{
+                "type": "text",
+                "text": system_prompt,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        return self._cached_system_blocks
+
     def _call_api_streaming(self, model: str, max_tokens: int,
-                            system_prompt: str) -> anthropic.types.Message:
+                            system: list[dict]) -> "anthropic.types.Message":
         """Call the Claude API with streaming for real-time text output."""
         text_started = False
 
         with self.client.messages.stream(
             model=model,
             max_tokens=max_tokens,
-            system=[{
-                "type": "text",
-                "text": system_prompt,
-                "cache_control": {"type": "ephemeral"}
-            }],
+            system=system,
             extra_headers={"anthropic-beta": "prompt-caching-2024-07-31"},
             tools=TOOL_DEFINITIONS,
+            # The SDK re-encodes the whole history on every call (it has no
+            # pre-encoded body API). Keep that a plain walk: blocks are dicts
+            # from the moment they're appended, tool outputs are capped before
+            # they enter the log, and old messages are pruned exactly once.
             messages=self.messages,
         ) as stream:
             for text in stream.text_stream:
@@ -205,8 +333,11 @@ class Agent:
             result = execute_tool(name, params, self.working_dir)
 
             display_tool_result(name, result)
+            if result.get("truncated_chars"):
+                display_truncation_notice(result["truncated_chars"])
 
-            diff_info = result.get("diff_info")
+            # Only edit_file results carry a diff (the old and new text)
+            diff_info = result.pop("diff_info", None)
             if diff_info and diff_info.get("old") is not None:
                 display_diff(
                     diff_info["path"],
@@ -232,12 +363,27 @@ class Agent:
         Invalidates caches so the workspace stays current."""
         if not self.workspace:
             return
-        rel = os.path.relpath(abs_path, self.workspace.root).replace("\\", "/")
+        # Tool paths are normpath'd like the root, so slicing off the root
+        # prefix is enough; relpath is only needed for anything outside it
+        prefix = self.workspace.root.rstrip(os.sep) + os.sep
+        if abs_path.startswith(prefix):
+            rel = abs_path[len(prefix):]
+        else:
+            rel = os.path.relpath(abs_path, self.workspace.root)
+        if os.sep != "/":
+            rel = rel.translate(_POSIX_TBL)
         self.workspace.invalidate_cache(rel)
         self.context_cache.invalidate(rel)
 
     # ── context pruning (token saver) ───────────────────────────────────────
 
+    def _append_message(self, role: str, content):
+        """Append a message and keep the running char total up to date."""
+        msg = {"role": role, "content": content}
+        count = self._msg_chars[id(msg)] = _content_chars(content)
+        self._approx_chars += count
+        self.messages.append(msg)
+
     def _maybe_prune_context(self):
         """Aggressively prune old messages to prevent token explosion.
 
@@ -248,8 +394,16 @@ class Agent:
 
         SDK objects must be converted to dicts before we can modify them.
         """
-        keep_recent = 4  # Keep last N messages fully intact
-        if len(self.messages) <= keep_recent + 2:
+        if len(self.messages) <= PRUNE_KEEP_RECENT + 2:
+            return
+        # Nothing worth freeing yet — skip the walk entirely
+        if self._approx_chars < PRUNE_AFTER_CHARS:
+            return
+
+        # Messages before _pruned_upto were already pruned and never change again
+        start = max(self._pruned_upto, 1)
+        end = len(self.messages) - PRUNE_KEEP_RECENT
+        if start >= end:
             return
 
         chars_before = self._estimate_message_chars()
@@ -258,7 +412,7 @@ class Agent:
         self._ensure_messages_are_dicts()
 
         # Second pass: prune old messages (keep msg[0] = original task, and last N)
-        for msg in self.messages[1:-keep_recent]:
+        for msg in self.messages[start:end]:
             content = msg.get("content")
 
             # Skip string-only messages (original user prompt)
@@ -268,6 +422,7 @@ class Agent:
             if not isinstance(content, list):
                 continue
 
+            pruned = False
             for block in content:
                 if not isinstance(block, dict):
                     continue
@@ -276,28 +431,37 @@ class Agent:
 
                 # Prune assistant text blocks (reasoning)
                 if btype == "text" and isinstance(block.get("text"), str):
-                    if len(block["text"]) > 200:
-                        block["text"] = block["text"][:80] + "\n[...pruned]"
+                    if len(block["text"]) > TEXT_PRUNE_THRESHOLD:
+                        block["text"] = block["text"][:TEXT_PRUNE_HEAD] + "\n[...pruned]"
+                        pruned = True
 
                 # Prune tool_use input blocks (the params sent to tools)
                 elif btype == "tool_use" and isinstance(block.get("input"), dict):
                     inp = block["input"]
                     for key, val in inp.items():
-                        if isinstance(val, str) and len(val) > 150:
-                            inp[key] = val[:60] + "...[pruned]"
+                        if isinstance(val, str) and len(val) > TOOL_PRUNE_THRESHOLD:
+                            inp[key] = val[:TOOL_PRUNE_HEAD] + "...[pruned]"
+                            pruned = True
 
                 # Prune tool_result blocks (THE main token burner)
                 elif btype == "tool_result":
                     c = block.get("content")
-                    if isinstance(c, str) and len(c) > 150:
-                        block["content"] = c[:60] + "...[pruned]"
+                    if isinstance(c, str) and len(c) > TOOL_PRUNE_THRESHOLD:
+                        block["content"] = c[:TOOL_PRUNE_HEAD] + "...[pruned]"
+                        pruned = True
                     elif isinstance(c, list):
                         for sub in c:
                             if isinstance(sub, dict) and sub.get("type") == "text":
-                                if isinstance(sub.get("text"), str) and len(sub["text"]) > 150:
-                                    sub["text"] = sub["text"][:60] + "...[pruned]"
+                                if isinstance(sub.get("text"), str) and len(sub["text"]) > TOOL_PRUNE_THRESHOLD:
+                                    sub["text"] = sub["text"][:TOOL_PRUNE_HEAD] + "...[pruned]"
+                                    pruned = True
+
+            if pruned:
+                self._msg_chars.pop(id(msg), None)
 
-        chars_after = self._estimate_message_chars()
+        self._pruned_upto = end
+
+        chars_after = self._approx_chars = self._estimate_message_chars()
         tokens_saved = (chars_before - chars_after) // 4
         if tokens_saved > 0:
             display_prune_notice(
@@ -305,51 +469,36 @@ class Agent:
             )
 
     def _ensure_messages_are_dicts(self):
-        """Convert Anthropic SDK content objects to plain dicts so we can mutate them."""
-        for msg in self.messages:
-            content = msg.get("content")
-            if not isinstance(content, list):
-                continue
+        """Convert Anthropic SDK content objects to plain dicts so we can mutate them.
 
-            new_content = []
-            for block in content:
-                if isinstance(block, dict):
-                    new_content.append(block)
-                elif hasattr(block, "type"):
-                    # Anthropic SDK object (TextBlock, ToolUseBlock, etc.)
-                    if block.type == "text":
-                        new_content.append({"type": "text", "text": block.text})
-                    elif block.type == "tool_use":
-                        new_content.append({
-                            "type": "tool_use",
-                            "id": block.id,
-                            "name": block.name,
-                            "input": dict(block.input) if block.input else {},
-                        })
-                    else:
-                        # Unknown type — keep as-is
-                        new_content.append(block)
-                else:
-                    new_content.append(block)
-
-            msg["content"] = new_content
+        Only messages appended since the last call are visited.
+        """
+        for msg in self.messages[self._dicts_converted_upto:]:
+            content = msg.get("content")
+            if isinstance(content, list):
+                msg["content"] = [_convert_block(block) for block in content]
+        self._dicts_converted_upto = len(self.messages)
 
     def _estimate_message_chars(self) -> int:
-        """Rough char count of all messages for pruning metrics."""
+        """Rough char count of all messages for pruning metrics.
+
+        Per-message counts are cached by message identity; pruning drops the
+        entry for any message it shortens so only changed messages are recounted.
+        """
         total = 0
+        cache = self._msg_chars
         for msg in self.messages:
-            content = msg.get("content")
-            if isinstance(content, str):
-                total += len(content)
-            elif isinstance(content, list):
-                total += len(str(content))
+            key = id(msg)
+            count = cache.get(key)
+            if count is None:
+                count = cache[key] = _content_chars(msg.get("content"))
+            total += count
         return total
 
     # ── display helpers ─────────────────────────────────────────────────────
 
-    def _display_final_text(self, content_blocks):
+    def _display_final_text(self, text_parts: list[str]):
         """Display the final agent response (when no tools are called)."""
-        text_parts = [b.text for b in content_blocks if b.type == "text"]
         if text_parts:
             display_agent_message("\n".join(text_parts))
 
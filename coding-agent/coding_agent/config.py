@@ -2,6 +2,8 @@
 """Configuration and constants for the coding agent."""
 
 import os
+import functools
+from collections import namedtuple
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,27 +19,41 @@ MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "75"))
 
 # ── Smart Router: Model tiers by task complexity ────────────────────────────
 #    The router picks a tier automatically. You can override models here.
-MODEL_TIERS = {
-    "low": {
-        "model": os.getenv("MODEL_LOW", "claude-sonnet-4-20250514"),
-        "max_tokens": 4096,
-        "max_iterations": 15,
-    },
-    "medium": {
-        "model": os.getenv("MODEL_MEDIUM", "claude-sonnet-4-20250514"),
-        "max_tokens": 8192,
-        "max_iterations": 30,
-    },
-    "high": {
-        "model": os.getenv("MODEL_HIGH", "claude-sonnet-4-20250514"),
-        "max_tokens": 16384,
-        "max_iterations": 50,
-    },
+TierSpec = namedtuple("TierSpec", "model max_tokens max_iterations")
+
+MODEL_TIERS: dict[str, TierSpec] = {
+    "low": TierSpec(
+        model=os.getenv("MODEL_LOW", "claude-sonnet-4-20250514"),
+        max_tokens=4096,
+        max_iterations=15,
+    ),
+    "medium": TierSpec(
+        model=os.getenv("MODEL_MEDIUM", "claude-sonnet-4-20250514"),
+        max_tokens=8192,
+        max_iterations=30,
+    ),
+    "high": TierSpec(
+        model=os.getenv("MODEL_HIGH", "claude-sonnet-4-20250514"),
+        max_tokens=16384,
+        max_iterations=50,
+    ),
 }
 
+
+def get_tier(name: str) -> TierSpec:
+    """Return the tier spec for a complexity level (unknown names → medium)."""
+    return MODEL_TIERS.get(name, MODEL_TIERS["medium"])
+
+
 # ── Conversation pruning (saves tokens on long runs) ───────────────────────
 #    After this many messages, older tool results get summarized/compressed.
 PRUNE_AFTER_MESSAGES = int(os.getenv("PRUNE_AFTER_MESSAGES", "20"))
+#    Pruning is skipped entirely while the history is smaller than this (~10k tokens).
+PRUNE_AFTER_CHARS = int(os.getenv("PRUNE_AFTER_CHARS", "40000"))
+
+#    Tool outputs longer than this are cut before they enter the conversation.
+MAX_TOOL_OUTPUT_CHARS = int(os.getenv("MAX_TOOL_OUTPUT_CHARS", "30000"))
+
 BASE_SYSTEM_PROMPT = """\
 You are an autonomous AI coding agent on the user's local machine.
 You have filesystem and terminal access within the working directory.
@@ -66,14 +82,17 @@ You have filesystem and terminal access within the working directory.
 SYSTEM_PROMPT = BASE_SYSTEM_PROMPT  # fallback for non-workspace mode
 
 
+@functools.lru_cache(maxsize=4)
 def build_system_prompt(workspace_context: str = "", rules: str = "") -> str:
     """Build the full system prompt with optional workspace context and rules injected."""
     parts = [BASE_SYSTEM_PROMPT]
 
     if workspace_context:
-        parts.append(f"## Workspace Context (pre-analyzed — avoid redundant reads)\n\n{workspace_context}")
+        parts.append("\n\n## Workspace Context (pre-analyzed — avoid redundant reads)\n\n")
+        parts.append(workspace_context)
 
     if rules:
-        parts.append(f"## User-Defined Rules\n\n{rules}")
+        parts.append("\n\n## User-Defined Rules\n\n")
+        parts.append(rules)
 
-    return "\n\n".join(parts)
+    return "".join(parts)
@@ -13,28 +13,66 @@ Never sends the entire repository. Only relevant sections.
 """
 
 import os
+import re
+import heapq
+import hashlib
+import functools
+from operator import itemgetter
 from typing import Optional
 
 from .workspace import Workspace
 
+try:
+    import tiktoken  # optional: real BPE counts instead of the char-ratio estimate
+except ImportError:
+    tiktoken = None
+
 # ═══════════════════════════════════════════════════════════════════════════════
-#  TOKEN ESTIMATION (lightweight, no external deps)
+#  TOKEN ESTIMATION (lightweight; uses tiktoken when installed)
 # ═══════════════════════════════════════════════════════════════════════════════
 
 CHARS_PER_TOKEN = 3.8  # conservative estimate for code
 
+_TRIM_MARKER = "\n\n[... content trimmed to fit token budget]"
+
+
+@functools.cache
+def _get_encoding():
+    """Return the BPE encoding, or None if tiktoken is missing or unusable
+    (e.g. its vocabulary can't be downloaded offline)."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _bpe_token_len(text: str) -> int:
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
 
 def estimate_tokens(text: str) -> int:
-    """Estimate token count from character length."""
-    return int(len(text) / CHARS_PER_TOKEN)
+    """Estimate token count (BPE count cached per text, else char length)."""
+    if _get_encoding() is None:
+        return int(len(text) / CHARS_PER_TOKEN)
+    return _bpe_token_len(text)
 
 
 def trim_to_tokens(text: str, max_tokens: int) -> str:
     """Trim text to fit within approximate token budget."""
-    max_chars = int(max_tokens * CHARS_PER_TOKEN)
-    if len(text) <= max_chars:
+    enc = _get_encoding()
+    if enc is None:
+        max_chars = int(max_tokens * CHARS_PER_TOKEN)
+        if len(text) <= max_chars:
+            return text
+        return text[:max_chars] + _TRIM_MARKER
+
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
         return text
-    return text[:max_chars] + "\n\n[... content trimmed to fit token budget]"
+    return enc.decode(tokens[:max(max_tokens, 0)]) + _TRIM_MARKER
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -42,31 +80,47 @@ def trim_to_tokens(text: str, max_tokens: int) -> str:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+# Line boundaries str.splitlines() honours besides "\n"
+_OTHER_LINE_BREAKS = re.compile("[\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
 def format_file_block(rel_path: str, content: str, max_lines: int = 60) -> str:
     """Format a file's content as a labeled block for AI context."""
-    lines = content.splitlines()
-    if len(lines) > max_lines:
+    if _OTHER_LINE_BREAKS.search(content):
+        lines = content.splitlines()
+        total = len(lines)
         shown = lines[:max_lines]
-        truncated = True
     else:
-        shown = lines
-        truncated = False
-
-    header = f"── {rel_path} ({len(lines)} lines) ──"
+        # Plain "\n" text: count instead of materialising every line
+        total = content.count("\n") + (0 if not content or content.endswith("\n") else 1)
+        if total <= max_lines:
+            body = content[:-1] if content.endswith("\n") else content
+            return f"── {rel_path} ({total} lines) ──\n{body}\n"
+        shown = content.split("\n", max_lines)[:max_lines]
+
+    header = f"── {rel_path} ({total} lines) ──"
     body = "\n".join(shown)
-    if truncated:
-        body += f"\n[... {len(lines) - max_lines} more lines — use read_file to see full content]"
+    if total > max_lines:
+        body += f"\n[... {total - max_lines} more lines — use read_file to see full content]"
 
     return f"{header}\n{body}\n"
 
 
 def format_file_summary(rel_path: str, info) -> str:
-    """Format a compact summary of a file (symbols only, no full content)."""
+    """Format a compact summary of a file (symbols only, no full content).
+    Memoized on the FileInfo for its own rel_path."""
+    cacheable = rel_path == getattr(info, "rel_path", None)
+    if cacheable and info.summary is not None:
+        return info.summary
+
     parts = [f"{rel_path} ({info.line_count} lines, {info.language or 'unknown'})"]
     if info.symbols:
         sym_strs = [f"  {s.kind} {s.name} L{s.line}" for s in info.symbols[:20]]
         parts.extend(sym_strs)
-    return "\n".join(parts)
+    summary = "\n".join(parts)
+    if cacheable:
+        info.summary = summary
+    return summary
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -74,64 +128,170 @@ def format_file_summary(rel_path: str, info) -> str:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def score_file_relevance(rel_path: str, info, instruction: str,
-                         active_file: Optional[str] = None) -> float:
-    """Score how relevant a file is to the current instruction.
-    Higher = more relevant. Range roughly 0.0 to 10.0."""
-    score = 0.0
-    instruction_lower = instruction.lower()
-    basename = os.path.basename(rel_path).lower()
-    basename_no_ext = os.path.splitext(basename)[0]
-
-    # Direct mention in instruction
-    if basename in instruction_lower or basename_no_ext in instruction_lower:
-        score += 5.0
-    if rel_path.lower() in instruction_lower:
-        score += 6.0
-
-    # Symbols mentioned in instruction
-    for sym in info.symbols:
-        if sym.name.lower() in instruction_lower and len(sym.name) > 2:
-            score += 3.0
-            break
-
-    # Related to active file
-    if active_file:
-        active_dir = os.path.dirname(active_file)
-        file_dir = os.path.dirname(rel_path)
-        if active_dir == file_dir:
-            score += 1.0
-        active_base = os.path.splitext(os.path.basename(active_file))[0]
-        if active_base in basename or basename_no_ext in active_base:
-            score += 2.0
-
-    # Language-keyword hints from instruction
-    lang_hints = {
-        "python": [".py", "pip", "pytest", "django", "flask", "fastapi"],
-        "javascript": [".js", "npm", "node", "react", "express", "webpack"],
-        "typescript": [".ts", ".tsx", "tsc", "angular", "next"],
-        "rust": [".rs", "cargo", "crate"],
-        "go": [".go", "go mod", "goroutine"],
-    }
-    for lang, hints in lang_hints.items():
-        if info.language == lang:
-            for hint in hints:
-                if hint in instruction_lower:
-                    score += 1.5
+# Instruction keywords that hint at a file's language
+_LANG_HINTS: dict[str, tuple[str, ...]] = {
+    "python": (".py", "pip", "pytest", "django", "flask", "fastapi"),
+    "javascript": (".js", "npm", "node", "react", "express", "webpack"),
+    "typescript": (".ts", ".tsx", "tsc", "angular", "next"),
+    "rust": (".rs", "cargo", "crate"),
+    "go": (".go", "go mod", "goroutine"),
+}
+
+# Config/entry-point stems worth a small boost (generic names like 'app' are
+# left out: they are often huge)
+_CONFIG_NAMES: frozenset[str] = frozenset(
+    {"main", "index", "config", "settings", "routes", "urls", "schema"}
+)
+
+
+def _find_mentions(text: str, mention_index: dict[str, list[tuple[str, bool]]],
+                   lengths: tuple[int, ...]) -> tuple[set[str], set[str]]:
+    """Return (files named in ``text``, files whose full path is in ``text``).
+
+    Either slides a window of every indexed key length over ``text`` and
+    looks each slice up, or tests each distinct key against ``text`` —
+    whichever needs fewer probes for this text length.
+    """
+    name_hits: set[str] = set()
+    path_hits: set[str] = set()
+    n = len(text)
+    windows = sum(n - k + 1 for k in lengths if k <= n)
+
+    if windows < len(mention_index):
+        get = mention_index.get
+        matches = []
+        for k in lengths:
+            if k > n:
+                break
+            for i in range(n - k + 1):
+                entries = get(text[i:i + k])
+                if entries is not None:
+                    matches.append(entries)
+    else:
+        matches = [entries for key, entries in mention_index.items() if key in text]
+
+    for entries in matches:
+        for rel_path, is_full_path in entries:
+            (path_hits if is_full_path else name_hits).add(rel_path)
+    return name_hits, path_hits
+
+
+class RelevanceScorer:
+    """Scores files against a single instruction.
+
+    Everything that depends only on the instruction / active file is computed
+    once here, so scoring the whole index is one pass of per-file work.
+    """
+
+    def __init__(self, instruction: str, active_file: Optional[str] = None,
+                 symbol_index: Optional[dict[str, list[str]]] = None,
+                 mention_index: Optional[dict[str, list[tuple[str, bool]]]] = None,
+                 mention_lengths: tuple[int, ...] = ()):
+        self.instruction_lower = instruction.lower()
+        self.active_file = active_file
+
+        # Files whose name / path appears in the instruction, found in one
+        # scan instead of three substring tests per file.
+        self.name_hits: Optional[set[str]] = None
+        self.path_hits: Optional[set[str]] = None
+        if mention_index is not None:
+            self.name_hits, self.path_hits = _find_mentions(
+                self.instruction_lower, mention_index, mention_lengths)
+
+        # Files defining a symbol mentioned in the instruction: one substring
+        # test per distinct symbol name instead of one per file × symbol.
+        self.symbol_hits: Optional[set[str]] = None
+        if symbol_index is not None:
+            instruction_lower = self.instruction_lower
+            hits: set[str] = set()
+            for name, paths in symbol_index.items():
+                if name in instruction_lower:
+                    hits.update(paths)
+            self.symbol_hits = hits
+
+        # Languages whose keywords appear in the instruction (checked once)
+        self.hinted_languages = frozenset(
+            lang for lang, hints in _LANG_HINTS.items()
+            if any(hint in self.instruction_lower for hint in hints)
+        )
+        if active_file:
+            self.active_dir = os.path.dirname(active_file)
+            self.active_base = os.path.splitext(os.path.basename(active_file))[0]
+
+    def score(self, rel_path: str, info) -> float:
+        """Score how relevant a file is to the instruction.
+        Higher = more relevant. Range roughly 0.0 to 10.0."""
+        score = 0.0
+        instruction_lower = self.instruction_lower
+        basename = info.basename_lower
+        basename_no_ext = info.stem_lower
+
+        # Direct mention in instruction
+        if self.name_hits is not None:
+            if rel_path in self.name_hits:
+                score += 5.0
+            if rel_path in self.path_hits:
+                score += 6.0
+        else:
+            if basename in instruction_lower or basename_no_ext in instruction_lower:
+                score += 5.0
+            if info.rel_path_lower in instruction_lower:
+                score += 6.0
+
+        # Symbols mentioned in instruction
+        if self.symbol_hits is not None:
+            if rel_path in self.symbol_hits:
+                score += 3.0
+        else:
+            for sym in info.symbols:
+                if sym.name.lower() in instruction_lower and len(sym.name) > 2:
+                    score += 3.0
                     break
 
-    # Slight boost for smaller files (more likely to be core logic)
-    if info.line_count < 200:
-        score += 0.3
-    elif info.line_count > 1000:
-        score -= 0.3
+        # Related to active file
+        if self.active_file:
+            if self.active_dir == info.dir_path:
+                score += 1.0
+            active_base = self.active_base
+            if active_base in basename or basename_no_ext in active_base:
+                score += 2.0
+
+        # Language-keyword hints from instruction
+        if info.language in self.hinted_languages:
+            score += 1.5
+
+        # Slight boost for smaller files (more likely to be core logic)
+        if info.line_count < 200:
+            score += 0.3
+        elif info.line_count > 1000:
+            score -= 0.3
+
+        # Config/entry point boost
+        if basename_no_ext in _CONFIG_NAMES:
+            score += 0.5
+
+        return score
+
+    def score_all(self, index: dict, min_score: float = 0.0) -> list[tuple[float, str, object]]:
+        """Score every file in the index; returns [(score, rel_path, info), ...]
+        in index order for files scoring at least ``min_score``."""
+        score = self.score
+        active_file = self.active_file
+        scored = []
+        for rel_path, info in index.items():
+            if rel_path == active_file:
+                continue
+            s = score(rel_path, info)
+            if s >= min_score:
+                scored.append((s, rel_path, info))
+        return scored
 
-    # Config/entry point boost (exclude generic names like 'app' which are often huge)
-    config_names = {"main", "index", "config", "settings", "routes", "urls", "schema"}
-    if basename_no_ext in config_names:
-        score += 0.5
 
-    return score
+def score_file_relevance(rel_path: str, info, instruction: str,
+                         active_file: Optional[str] = None) -> float:
+    """Score how relevant a file is to the current instruction.
+    Higher = more relevant. Range roughly 0.0 to 10.0."""
+    return RelevanceScorer(instruction, active_file).score(rel_path, info)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -139,6 +299,9 @@ def score_file_relevance(rel_path: str, info, instruction: str,
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+_SUMMARIES_HEADER = "Potentially relevant files (use read_file for content):"
+
+
 class ContextAssembler:
     """Builds priority-ordered context for the AI, fitting within a token budget."""
 
@@ -154,29 +317,25 @@ class ContextAssembler:
         massive tokens vs stuffing file contents into the system prompt.
         """
         sections: list[tuple[int, str, str]] = []
-        # (priority, label, content)  — lower priority number = higher importance
+        # (priority, label, content)  — lower priority number = higher importance.
+        # Append in priority order: _assemble consumes them as-is.
 
         # ── Priority 1: Workspace overview (always included, compact) ───────
         structure = self.ws.get_structure_summary(max_lines=60)
         sections.append((1, "WORKSPACE", structure))
 
         # ── Priority 2: Relevant file SUMMARIES (symbols only, no content) ──
-        scored = []
-        for rel_path, info in self.ws.index.items():
-            if rel_path == active_file:
-                continue
-            s = score_file_relevance(rel_path, info, instruction, active_file)
-            if s >= 2.0:
-                scored.append((s, rel_path, info))
-
-        scored.sort(key=lambda x: -x[0])
-        top_files = scored[:self.ws.config.max_context_files]
-
-        # Only summaries — never full content in system prompt
+        scorer = RelevanceScorer(instruction, active_file, self.ws.symbol_index,
+                                 self.ws.mention_index, self.ws.mention_lengths)
+        scored = scorer.score_all(self.ws.index, min_score=2.0)
+        # Ties keep index order, exactly like the stable sort this replaces
+        top_files = heapq.nlargest(self.ws.config.max_context_files, scored, key=itemgetter(0))
+
+        # Only summaries — never full content in system prompt. Per-file
+        # summaries are memoized strings; one str.join builds the section.
         if top_files:
-            summary_lines = ["Potentially relevant files (use read_file for content):"]
-            for _s, rel_path, info in top_files:
-                summary_lines.append(format_file_summary(rel_path, info))
+            summary_lines = [_SUMMARIES_HEADER]
+            summary_lines += [format_file_summary(rel_path, info) for _s, rel_path, info in top_files]
             sections.append((2, "RELEVANT_SUMMARIES", "\n".join(summary_lines)))
 
         # ── Priority 3: Workspace rules ─────────────────────────────────────
@@ -197,12 +356,15 @@ class ContextAssembler:
         return trim_to_tokens(result, self.token_budget)
 
     def _assemble(self, sections: list[tuple[int, str, str]]) -> str:
-        """Assemble sections in priority order, trimming from lowest priority up."""
-        # Sort by priority (ascending = most important first)
-        sections.sort(key=lambda x: x[0])
+        """Assemble sections in priority order, trimming from lowest priority up.
+
+        ``sections`` must already be in ascending priority order — ``build``
+        appends them that way, so no sort is needed here.
+        """
+        assert all(a[0] <= b[0] for a, b in zip(sections, sections[1:])), \
+            "context sections must be appended in priority order"
 
         output_parts: list[str] = []
-        used_tokens = 0
         remaining = self.token_budget
 
         for priority, label, content in sections:
@@ -210,14 +372,11 @@ class ContextAssembler:
 
             if content_tokens <= remaining:
                 output_parts.append(content)
-                used_tokens += content_tokens
                 remaining -= content_tokens
             elif remaining > 500:
-                # Partial inclusion — trim to fit
-                trimmed = trim_to_tokens(content, remaining - 100)
-                output_parts.append(trimmed)
-                used_tokens += estimate_tokens(trimmed)
-                remaining = 0
+                # Partial inclusion — trim to fit. Nothing follows it, so the
+                # trimmed text is never re-counted.
+                output_parts.append(trim_to_tokens(content, remaining - 100))
                 break
             else:
                 # No more room
@@ -231,18 +390,28 @@ class ContextAssembler:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+def content_digest(content: str | bytes) -> bytes:
+    """16-byte BLAKE2b digest of file content, used as a ContentCache key."""
+    if isinstance(content, str):
+        content = content.encode("utf-8", errors="surrogatepass")
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
 class ContentCache:
     """Tracks which file contents have already been sent to the AI in this session.
-    Avoids re-sending identical content, saving tokens."""
+    Avoids re-sending identical content, saving tokens.
+
+    Hashes are raw 16-byte digests (see ``content_digest``), not hex strings.
+    """
 
     def __init__(self):
-        self._sent_hashes: dict[str, str] = {}  # rel_path -> content_hash
+        self._sent_hashes: dict[str, bytes] = {}  # rel_path -> content digest
 
-    def is_already_sent(self, rel_path: str, content_hash: str) -> bool:
+    def is_already_sent(self, rel_path: str, content_hash: bytes) -> bool:
         """Check if this exact file content was already sent."""
         return self._sent_hashes.get(rel_path) == content_hash
 
-    def mark_sent(self, rel_path: str, content_hash: str):
+    def mark_sent(self, rel_path: str, content_hash: bytes):
         """Record that this file's content has been sent."""
         self._sent_hashes[rel_path] = content_hash
 
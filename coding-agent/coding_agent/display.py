@@ -1,45 +1,50 @@
 # Copyright (c) 2026 — See LICENSE file for details.
 """Rich terminal display utilities for the coding agent."""
 
-import difflib
-from rich.console import Console
+import functools
+import re
+import reprlib
+import sys
+import time
+from rich.console import Console, Group
 from rich.panel import Panel
-from rich.syntax import Syntax
-from rich.markdown import Markdown
 from rich.table import Table
 from rich.text import Text
 from rich.rule import Rule
-from rich.columns import Columns
-from ._compat import get_terminal_encoding_label as _get_tenc
+from rich.segment import Segments
+from . import __author__
 
 console = Console()
 
-# ── Terminal rendering constants ──────────────────────────────────────────────
-_TENC_LABEL = _get_tenc()
+# Piped / redirected output skips Rich's Markdown, Syntax and Panel rendering
+_IS_TTY = console.is_terminal
 
+_BLANK = Text("")
+_THINKING_RULE = Text("  ─────────────────────────────────────────", style="dim cyan")
 
-def _render_frame():
-    """Build the startup frame with terminal encoding metadata."""
-    _lbl = _TENC_LABEL
-    return (
-        " ╔═══════════════════════════════════════════════════════════╗\n"
-        " ║            LOCAL AI CODING AGENT  v1.0                   ║\n"
-        " ║         Autonomous · Precise · Relentless                ║\n"
-        f" ║            Built by {_lbl}                       ║\n"
-        " ╚═══════════════════════════════════════════════════════════╝"
-    )
+BANNER = (
+    " ╔═══════════════════════════════════════════════════════════╗\n"
+    " ║            LOCAL AI CODING AGENT  v1.0                   ║\n"
+    " ║         Autonomous · Precise · Relentless                ║\n"
+    f" ║            Built by {__author__}                       ║\n"
+    " ╚═══════════════════════════════════════════════════════════╝"
+)
 
 
-BANNER = _render_frame()
+# Static, so styled once at import rather than markup-parsed on every print
+_TAGLINE = Text.from_markup(
+    f"  Powered by Claude | Built by {__author__} | Type your task or [bold]quit[/bold] to exit.\n",
+    style="dim",
+)
+_WELCOME = Group(Text(BANNER, style="bold cyan"), _TAGLINE)
 
 
 def display_welcome():
     """Show the startup banner."""
-    console.print(BANNER, style="bold cyan", highlight=False)
-    console.print(
-        f"  Powered by Claude | Built by {_TENC_LABEL} | Type your task or [bold]quit[/bold] to exit.\n",
-        style="dim",
-    )
+    if not _IS_TTY:
+        sys.stdout.write(f"{BANNER}\n{_TAGLINE.plain}\n")
+        return
+    console.print(_WELCOME)
 
 
 def display_goodbye():
@@ -47,10 +52,28 @@ def display_goodbye():
     console.print("\n  Goodbye! Happy coding.\n", style="bold cyan")
 
 
-def get_user_input():
-    """Prompt the user for input."""
+def get_user_input(seed: str = ""):
+    """Prompt the user for input, optionally pre-filled with ``seed``."""
     console.print()
-    return console.input("[bold dodger_blue2]  You ▸ [/]")
+    prompt = "[bold dodger_blue2]  You ▸ [/]"
+    if not seed:
+        return console.input(prompt)
+
+    try:
+        import readline
+    except ImportError:
+        # No line editor to pre-fill — show the seed and append to it.
+        return seed + console.input(prompt + seed.replace("[", "\\["))
+
+    def _insert_seed():
+        readline.insert_text(seed)
+        readline.redisplay()
+
+    readline.set_pre_input_hook(_insert_seed)
+    try:
+        return console.input(prompt)
+    finally:
+        readline.set_pre_input_hook()
 
 
 def display_iteration(n, max_n):
@@ -66,39 +89,95 @@ def display_iteration(n, max_n):
 # ── Agent text streaming ────────────────────────────────────────────────────
 
 
+class _StreamBuffer:
+    """Coalesces small streamed chunks into fewer console writes.
+
+    Flushes on a newline, once ``flush_chars`` are pending, or when
+    ``flush_interval`` seconds have passed since the last write.
+    """
+
+    def __init__(self, flush_chars: int = 256, flush_interval: float = 0.016):
+        self.flush_chars = flush_chars
+        self.flush_interval = flush_interval
+        self._parts: list[str] = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def feed(self, chunk: str):
+        self._parts.append(chunk)
+        self._pending += len(chunk)
+        if ("\n" in chunk or self._pending >= self.flush_chars
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            console.print("".join(self._parts), end="", highlight=False, soft_wrap=True)
+            self._parts.clear()
+            self._pending = 0
+        self._last_flush = time.monotonic()
+
+
+_stream_buffer = _StreamBuffer()
+
+
 def start_thinking():
     """Print the header before streamed thinking text."""
-    console.print("\n[bold cyan]  ◆ Agent[/bold cyan]")
-    console.print("[dim cyan]  ─────────────────────────────────────────[/dim cyan]")
+    _stream_buffer.flush()
+    console.print(Group(_BLANK, Text("  ◆ Agent", style="bold cyan"), _THINKING_RULE))
 
 
 def stream_text(chunk: str):
-    """Print a chunk of streamed text (no newline)."""
-    console.print(chunk, end="", highlight=False, soft_wrap=True)
+    """Print a chunk of streamed text (no newline). Writes are batched."""
+    _stream_buffer.feed(chunk)
 
 
 def end_thinking():
     """Print the footer after streamed thinking text."""
-    console.print()
-    console.print("[dim cyan]  ─────────────────────────────────────────[/dim cyan]")
+    _stream_buffer.flush()
+    console.print(Group(_BLANK, _THINKING_RULE))
 
 
 def display_agent_message(text: str):
     """Show a final agent message in a panel."""
-    console.print()
-    console.print(
+    if not _IS_TTY:
+        sys.stdout.write(f"\n✔ Agent Response\n{text}\n")
+        return
+    from rich.markdown import Markdown  # deferred: heavy import, first call only
+
+    console.print(Group(
+        _BLANK,
         Panel(
             Markdown(text),
             title="[bold green]✔ Agent Response[/bold green]",
             border_style="green",
             padding=(1, 2),
-        )
-    )
+        ),
+    ))
 
 
 # ── Tool calls ──────────────────────────────────────────────────────────────
 
 
+# Bounded repr for container params: never builds the full string of a
+# large list/dict just to cut it down to a preview.
+_PARAM_REPR = reprlib.Repr()
+_PARAM_REPR.maxlevel = 3
+_PARAM_REPR.maxstring = _PARAM_REPR.maxother = 200
+_PARAM_REPR.maxlist = _PARAM_REPR.maxtuple = _PARAM_REPR.maxset = _PARAM_REPR.maxdict = 50
+
+
+def _short(value, limit: int = 200) -> str:
+    """Preview of a tool parameter, at most ``limit`` chars plus an ellipsis."""
+    if isinstance(value, str):
+        text = value[:limit + 1]
+    elif isinstance(value, (list, tuple, dict, set)):
+        text = _PARAM_REPR.repr(value)
+    else:
+        text = str(value)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
 def display_tool_call(name: str, params: dict):
     """Show which tool is being called and its parameters."""
     table = Table(show_header=False, box=None, padding=(0, 1), expand=False)
@@ -106,20 +185,17 @@ def display_tool_call(name: str, params: dict):
     table.add_column("Value", style="white")
 
     for key, value in params.items():
-        val_str = str(value)
-        if len(val_str) > 200:
-            val_str = val_str[:200] + "…"
-        table.add_row(key, val_str)
+        table.add_row(key, _short(value))
 
-    console.print()
-    console.print(
+    console.print(Group(
+        _BLANK,
         Panel(
             table,
             title=f"[bold yellow]⚡ {name}[/bold yellow]",
             border_style="yellow",
             padding=(0, 1),
-        )
-    )
+        ),
+    ))
 
 
 def display_tool_result(name: str, result: dict):
@@ -139,36 +215,89 @@ def display_tool_result(name: str, result: dict):
     if len(display_output) > 3000:
         display_output = display_output[:3000] + f"\n\n… ({len(output) - 3000} more chars truncated)"
 
-    console.print(
-        Panel(
-            Text(display_output, overflow="fold"),
-            title=title,
-            border_style=style,
-            padding=(0, 1),
-        )
+    if not _IS_TTY:
+        label = f"✗ {name} — ERROR" if is_error else f"✓ {name}"
+        sys.stdout.write(f"{label}\n{display_output}\n")
+        return
+
+    console.print(_tool_result_segments(title, style, display_output, console.width))
+
+
+@functools.lru_cache(maxsize=32)
+def _tool_result_segments(title: str, border_style: str, output: str, width: int) -> Segments:
+    """Render a tool-result panel once per (output, width); folding KB-sized
+    output is the expensive part and repeats verbatim on retries."""
+    panel = Panel(
+        Text(output, overflow="fold"),
+        title=title,
+        border_style=border_style,
+        padding=(0, 1),
     )
+    return Segments(list(console.render(panel, console.options.update_width(width))))
 
 
 # ── Diff display ────────────────────────────────────────────────────────────
 
 
-def display_diff(filepath: str, old_content: str, new_content: str):
-    """Show a unified diff of a file edit."""
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@")
+
+
+def _unified_diff(filepath: str, old_content: str, new_content: str, context: int = 3) -> str:
+    """Unified diff text. Identical leading/trailing lines are stripped before
+    running difflib (minus ``context`` lines kept for the hunks), so a small
+    edit in a large file only diffs the edited region."""
+    import difflib
+
     old_lines = old_content.splitlines(keepends=True)
     new_lines = new_content.splitlines(keepends=True)
+    n_old, n_new = len(old_lines), len(new_lines)
+    limit = min(n_old, n_new)
+
+    prefix = 0
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    if prefix == n_old == n_new:
+        return ""
+    suffix = 0
+    while (suffix < limit - prefix
+           and old_lines[n_old - 1 - suffix] == new_lines[n_new - 1 - suffix]):
+        suffix += 1
+
+    start = max(prefix - context, 0)
+    tail = max(suffix - context, 0)
     diff = difflib.unified_diff(
-        old_lines,
-        new_lines,
+        old_lines[start:n_old - tail],
+        new_lines[start:n_new - tail],
         fromfile=f"a/{filepath}",
         tofile=f"b/{filepath}",
-        lineterm="",
+        n=context,
     )
-    diff_text = "".join(diff)
+
+    out = []
+    for line in diff:
+        if start and line.startswith("@@"):
+            line = _HUNK_HEADER.sub(
+                lambda m: (f"@@ -{int(m[1]) + start}{m[2] or ''} "
+                           f"+{int(m[3]) + start}{m[4] or ''} @@"),
+                line,
+            )
+        out.append(line if line.endswith("\n") else line + "\n")
+    return "".join(out)
+
+
+def display_diff(filepath: str, old_content: str, new_content: str):
+    """Show a unified diff of a file edit."""
+    diff_text = _unified_diff(filepath, old_content, new_content)
 
     if not diff_text.strip():
         console.print("  [dim]No changes.[/dim]")
         return
 
+    if not _IS_TTY:
+        sys.stdout.write(diff_text + "\n")
+        return
+    from rich.syntax import Syntax  # deferred: pulls in Pygments
+
     console.print(
         Syntax(
             diff_text,
@@ -203,15 +332,15 @@ def display_workspace_info(root: str, total_files: int, total_lines: int,
 
     table.add_row("Scan time", f"{scan_time:.2f}s")
 
-    console.print()
-    console.print(
+    console.print(Group(
+        _BLANK,
         Panel(
             table,
             title="[bold blue]📂 Workspace Opened[/bold blue]",
             border_style="blue",
             padding=(0, 1),
-        )
-    )
+        ),
+    ))
 
 
 def display_workspace_refresh(changed: int, removed: int):
@@ -242,15 +371,15 @@ def display_routing_decision(complexity: str, model: str, max_tokens: int,
     if reasoning:
         table.add_row("Reasoning", f"[dim]{reasoning}[/dim]")
 
-    console.print()
-    console.print(
+    console.print(Group(
+        _BLANK,
         Panel(
             table,
             title="[bold magenta]🧠 Smart Router[/bold magenta]",
             border_style="magenta",
             padding=(0, 1),
-        )
-    )
+        ),
+    ))
 
 
 def display_cost_estimate(input_tokens: int, output_tokens: int):
@@ -277,6 +406,13 @@ def display_prune_notice(old_count: int, new_count: int, tokens_saved: int = 0):
         )
 
 
+def display_truncation_notice(chars_dropped: int):
+    """Show that a tool's output was cut to the output cap before sending."""
+    console.print(
+        f"  [dim magenta]✂ Tool output truncated: {chars_dropped:,} characters dropped[/dim magenta]"
+    )
+
+
 # ── Errors & status ────────────────────────────────────────────────────────
 
 
@@ -297,8 +433,9 @@ def display_status(text: str):
     console.print(f"  [dim]{text}[/dim]")
 
 
-def display_token_usage(input_tokens: int, output_tokens: int):
-    """Show token usage for the current API call."""
+def display_token_usage(input_tokens: int, output_tokens: int, cache_read_tokens: int = 0):
+    """Show token usage for the current API call (and prompt-cache hits, if any)."""
+    cached = f"  ⚡cached {cache_read_tokens:,}" if cache_read_tokens else ""
     console.print(
-        f"  [dim]Tokens: ↑{input_tokens:,}  ↓{output_tokens:,}[/dim]"
+        f"  [dim]Tokens: ↑{input_tokens:,}  ↓{output_tokens:,}{cached}[/dim]"
     )
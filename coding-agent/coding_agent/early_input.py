@@ -0,0 +1,138 @@
+# Copyright (c) 2026 — See LICENSE file for details.
+"""Early input capture — buffers keystrokes typed before the REPL is ready.
+
+Workspace analysis can take a while on large projects. Anything the user
+types in that window would normally be lost (or echoed into the middle of
+the startup output). This module reads the terminal in a background thread
+from the moment ``main()`` starts and hands the buffered text to the first
+prompt so it can be pre-filled.
+
+Only active when stdin is an interactive terminal. Piped input is left alone.
+"""
+
+import atexit
+import os
+import sys
+import threading
+
+_buffer: list[str] = []
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+_restore_terminal = None
+
+
+def start_capturing_early_input():
+    """Start buffering stdin keystrokes in a background thread (TTY only)."""
+    global _thread, _restore_terminal
+    if _thread is not None:
+        return
+    try:
+        if not sys.stdin.isatty():
+            return
+    except (AttributeError, ValueError):
+        return
+
+    if os.name == "nt":
+        target = _capture_windows
+    else:
+        try:
+            import termios
+            import tty
+        except ImportError:
+            return
+        try:
+            fd = sys.stdin.fileno()
+            saved = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        except (OSError, termios.error):
+            return
+
+        _restore_terminal = lambda: termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+        target = _capture_posix
+
+    _stop.clear()
+    _thread = threading.Thread(target=target, name="early-input", daemon=True)
+    _thread.start()
+    atexit.register(stop_capturing_early_input)
+
+
+def stop_capturing_early_input():
+    """Stop the capture thread and restore the terminal mode."""
+    global _thread, _restore_terminal
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join(timeout=0.5)
+    _thread = None
+    if _restore_terminal is not None:
+        try:
+            _restore_terminal()
+        except Exception:
+            pass
+        _restore_terminal = None
+
+
+def drain_early_input() -> str:
+    """Stop capturing and return everything typed so far as a single line."""
+    stop_capturing_early_input()
+    text = _clean("".join(_buffer))
+    _buffer.clear()
+    return text
+
+
+# ── Capture loops ───────────────────────────────────────────────────────────
+
+
+def _capture_posix():
+    import select
+
+    fd = sys.stdin.fileno()
+    while not _stop.is_set():
+        try:
+            ready, _, _ = select.select([fd], [], [], 0.05)
+            if not ready:
+                continue
+            data = os.read(fd, 1024)
+        except (OSError, ValueError):
+            return
+        if not data:
+            return
+        _buffer.append(data.decode("utf-8", errors="ignore"))
+
+
+def _capture_windows():
+    import msvcrt
+
+    while not _stop.is_set():
+        if msvcrt.kbhit():
+            ch = msvcrt.getwch()
+            if ch in ("\x00", "\xe0"):
+                msvcrt.getwch()  # swallow the second half of special keys
+                continue
+            _buffer.append(ch)
+        else:
+            _stop.wait(0.05)
+
+
+def _clean(raw: str) -> str:
+    """Apply backspaces, drop escape sequences and control chars."""
+    out: list[str] = []
+    i = 0
+    while i < len(raw):
+        ch = raw[i]
+        if ch in ("\x7f", "\b"):
+            if out:
+                out.pop()
+        elif ch == "\x1b":
+            # Skip CSI/SS3 sequences such as arrow keys (ESC [ A, ESC O P)
+            i += 1
+            if i < len(raw) and raw[i] in "[O":
+                i += 1
+                while i < len(raw) and not raw[i].isalpha() and raw[i] != "~":
+                    i += 1
+        elif ch in ("\r", "\n", "\t"):
+            out.append(" ")
+        elif ch.isprintable():
+            out.append(ch)
+        i += 1
+    return "".join(out).strip()
@@ -6,18 +6,70 @@ This module never sends data externally. All processing is local.
 
 import os
 import re
+import sys
+import codecs
 import hashlib
 import json
+import mmap
 import fnmatch
+from stat import S_ISREG
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field, asdict
 from typing import Optional
 
+try:
+    import orjson  # optional: much faster (de)serialization of the index cache
+except ImportError:
+    orjson = None
+
+try:
+    import blake3  # optional: SIMD-accelerated content hashing
+except ImportError:
+    blake3 = None
+
+try:
+    import re2  # optional: google-re2, a linear-time regex engine
+except ImportError:
+    re2 = None
+
+# Below this many files to (re)index, a thread pool costs more than it saves
+_PARALLEL_MIN_FILES = 32
+
+# Files up to this size are read in one go; larger ones are streamed
+_READ_ONCE_LIMIT = 1 << 20
+
+# Chunk size for streamed hashing and mmap line counting. Reads this large
+# bypass the BufferedReader's own buffer, so open() keeps its default.
+_STREAM_CHUNK = 1 << 20
+
+# Source files at least this big are scanned through mmap with byte regexes,
+# so neither a bytes copy nor a decoded str of the whole file is built
+_MMAP_MIN_SIZE = 128 * 1024
+
+# Bytes that would make a byte-level scan disagree with the str one:
+# non-ASCII (decoding, Unicode \w/\s), CR (newline normalisation) and the
+# control characters str.splitlines() / str \s treat specially
+_NOT_PLAIN_ASCII = re.compile(rb"[\x80-\xff\r\x0b\x0c\x1c-\x1f]")
+
+# Content hashes are only used for change detection, so speed wins over
+# cryptographic strength. Recorded in the index cache so a cache written
+# with another algorithm is treated as stale.
+if blake3 is not None:
+    HASH_ALGO = "blake3"
+    _new_hasher = blake3.blake3
+else:
+    HASH_ALGO = "blake2b-128"
+
+    def _new_hasher():
+        return hashlib.blake2b(digest_size=16)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 #  DATA STRUCTURES
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-@dataclass
+@dataclass(slots=True)
 class Symbol:
     """A code symbol (function, class, etc.) found in a file."""
     kind: str          # "function", "class", "method", "interface", "struct", etc.
@@ -26,7 +78,7 @@ class Symbol:
     end_line: int = 0  # approximate end line (0 = unknown)
 
 
-@dataclass
+@dataclass(slots=True)
 class FileInfo:
     """Metadata for a single indexed file."""
     abs_path: str
@@ -39,21 +91,35 @@ class FileInfo:
     symbols: list[Symbol] = field(default_factory=list)
     imports: list[str] = field(default_factory=list)
     language: str = ""
+    # Derived from rel_path once, so relevance scoring is attribute access only
+    basename_lower: str = field(init=False, repr=False, compare=False)
+    stem_lower: str = field(init=False, repr=False, compare=False)
+    rel_path_lower: str = field(init=False, repr=False, compare=False)
+    dir_path: str = field(init=False, repr=False, compare=False)
+    # Context summary memoized by context.format_file_summary (a changed file
+    # gets a fresh FileInfo on rescan, which drops it)
+    summary: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.basename_lower = os.path.basename(self.rel_path).lower()
+        self.stem_lower = os.path.splitext(self.basename_lower)[0]
+        self.rel_path_lower = self.rel_path.lower()
+        self.dir_path = os.path.dirname(self.rel_path)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  DEFAULT IGNORE RULES
 # ═══════════════════════════════════════════════════════════════════════════════
 
-DEFAULT_SKIP_DIRS = {
+DEFAULT_SKIP_DIRS = frozenset({
     "node_modules", ".git", "__pycache__", ".venv", "venv", "env",
     ".next", ".nuxt", "dist", "build", ".cache", ".tox", ".mypy_cache",
     ".pytest_cache", "coverage", ".turbo", ".svelte-kit", "target",
     ".idea", ".gradle", "vendor", ".localai", ".eggs", ".hg", ".svn",
     "bower_components", ".terraform", ".serverless",
-}
+})
 
-BINARY_EXTENSIONS = {
+BINARY_EXTENSIONS = frozenset({
     ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".svg",
     ".mp3", ".mp4", ".wav", ".avi", ".mov", ".woff", ".woff2", ".ttf",
     ".eot", ".otf", ".zip", ".tar", ".gz", ".bz2", ".7z", ".rar",
@@ -61,7 +127,7 @@ BINARY_EXTENSIONS = {
     ".class", ".jar", ".war", ".pdf", ".doc", ".docx", ".xls", ".xlsx",
     ".pptx", ".db", ".sqlite", ".sqlite3", ".lock", ".bin", ".dat",
     ".iso", ".img", ".dmg", ".msi", ".deb", ".rpm",
-}
+})
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  LANGUAGE DETECTION
@@ -105,9 +171,11 @@ _EXT_TO_LANG = {
 }
 
 
-def detect_language(filepath: str) -> str:
-    """Detect programming language from file extension."""
-    ext = os.path.splitext(filepath)[1].lower()
+def detect_language(filepath: str, ext: Optional[str] = None) -> str:
+    """Detect programming language from file extension. ``ext`` is the
+    lowercased extension, if the caller already has it."""
+    if ext is None:
+        ext = os.path.splitext(filepath)[1].lower()
     lang = _EXT_TO_LANG.get(ext, "")
     if not lang:
         basename = os.path.basename(filepath).lower()
@@ -126,12 +194,45 @@ def detect_language(filepath: str) -> str:
 
 _SYMBOL_PATTERNS: dict[str, list[tuple[str, re.Pattern]]] = {}
 
+# Per language: all its patterns as one alternation (per-line form and a
+# whole-buffer MULTILINE form), plus a map from the matched alternative's
+# group index to (kind, index of its name group)
+_SYMBOL_COMBINED: dict[str, tuple[re.Pattern, re.Pattern, dict[int, tuple[str, int]]]] = {}
+
+# Per language: keywords of which every symbol match contains at least one
+# (a literal prefilter). Languages whose patterns can match without a keyword
+# — e.g. C-style "int foo(" functions — have no entry.
+_SYMBOL_LITERALS: dict[str, tuple[str, ...]] = {
+    "python": ("class", "def"),
+    "javascript": ("class", "function", "const", "let", "var"),
+    "typescript": ("class", "function", "const", "let", "var"),
+    "go": ("func", "type"),
+    "rust": ("fn", "struct", "trait", "impl"),
+    "ruby": ("class", "def", "module"),
+    "php": ("class", "function"),
+    "swift": ("class", "struct", "func"),
+}
+
+# google-re2 versions of the whole-buffer patterns, when installed and not
+# disabled with USE_RE2=0. RE2's \w and \s are ASCII-only, so they are only
+# used on text where that gives the same matches as the stdlib patterns.
+_SYMBOL_COMBINED_RE2: dict[str, object] = {}
+_USE_RE2 = re2 is not None and os.getenv("USE_RE2", "1") != "0"
+
+# Line boundaries str.splitlines() honours besides "\n"
+_OTHER_LINE_BREAK_CHARS = "\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+_OTHER_LINE_BREAKS = re.compile(f"[{_OTHER_LINE_BREAK_CHARS}]")
+
+
+def _single_line(pattern: str) -> str:
+    """Stop ``\\s`` and negated classes from matching across a newline, so a
+    MULTILINE search of the whole buffer matches exactly what a per-line
+    match would."""
+    return pattern.replace("[^", "[^\\n").replace(r"\s", r"[^\S\n]")
+
 
 def _compile_patterns():
     """Compile regex patterns for symbol extraction."""
-    if _SYMBOL_PATTERNS:
-        return
-
     _SYMBOL_PATTERNS["python"] = [
         ("class",    re.compile(r"^class\s+(\w+)")),
         ("function", re.compile(r"^def\s+(\w+)")),
@@ -177,13 +278,46 @@ def _compile_patterns():
         ("function", re.compile(r"^\s*(?:public|internal|fileprivate|private|static|override|mutating)?\s*func\s+(\w+)")),
     ]
 
+    # Regex alternation is ordered, so the first pattern that matches still
+    # wins — one engine call per line instead of one per pattern.
+    combined_by_id: dict[int, tuple[re.Pattern, re.Pattern, dict[int, tuple[str, int]]]] = {}
+    fast_by_id: dict[int, object] = {}
+    for lang, patterns in _SYMBOL_PATTERNS.items():
+        if id(patterns) not in combined_by_id:
+            alternatives = []
+            kinds: dict[int, tuple[str, int]] = {}
+            group = 1
+            for kind, pattern in patterns:
+                # match() anchors anyway; the buffer form anchors once, up front
+                alternatives.append(f"({pattern.pattern.removeprefix('^')})")
+                kinds[group] = (kind, group + 1)
+                group += pattern.groups + 1
+            combined = "|".join(alternatives)
+            buffer_pattern = f"^(?:{_single_line(combined)})"
+            combined_by_id[id(patterns)] = (
+                re.compile(combined),
+                re.compile(buffer_pattern, re.MULTILINE),
+                kinds,
+            )
+            fast_by_id[id(patterns)] = None
+            if _USE_RE2:
+                try:
+                    fast_by_id[id(patterns)] = re2.compile("(?m)" + buffer_pattern)
+                except Exception:
+                    pass  # pattern RE2 can't take — the stdlib one is used
+        _SYMBOL_COMBINED[lang] = combined_by_id[id(patterns)]
+        if fast_by_id[id(patterns)] is not None:
+            _SYMBOL_COMBINED_RE2[lang] = fast_by_id[id(patterns)]
+
 
 _IMPORT_PATTERNS: dict[str, re.Pattern] = {}
+_IMPORT_BUFFER_PATTERNS: dict[str, tuple[re.Pattern, bool]] = {}
+
+# The first 100 lines of a file, without the newline ending the last one
+_HEAD_100_LINES = re.compile(r"(?:[^\n]*\n){0,99}[^\n]*")
 
 
 def _compile_import_patterns():
-    if _IMPORT_PATTERNS:
-        return
     _IMPORT_PATTERNS["python"] = re.compile(r"^(?:from\s+(\S+)\s+import|import\s+(\S+))")
     _IMPORT_PATTERNS["javascript"] = re.compile(r"""(?:import\s+.*?from\s+['"]([^'"]+)['"]|require\s*\(\s*['"]([^'"]+)['"])""")
     _IMPORT_PATTERNS["typescript"] = _IMPORT_PATTERNS["javascript"]
@@ -192,41 +326,165 @@ def _compile_import_patterns():
     _IMPORT_PATTERNS["rust"] = re.compile(r"^use\s+([^;]+);")
     _IMPORT_PATTERNS["csharp"] = re.compile(r"^using\s+(?:static\s+)?([^;]+);")
 
+    # Buffer variants kept on one line. Anchored ones match right after a
+    # "\n" (a literal prefix re can search for quickly) in "\n" + head;
+    # unanchored ones are deduplicated to the first match on each line.
+    for lang, pattern in _IMPORT_PATTERNS.items():
+        body = pattern.pattern
+        if body.startswith("^"):
+            _IMPORT_BUFFER_PATTERNS[lang] = (re.compile("\\n" + _single_line(body[1:])), True)
+        else:
+            _IMPORT_BUFFER_PATTERNS[lang] = (re.compile(_single_line(body)), False)
+
+
+# Built once, at import: the tables are filled in several steps, so building
+# them lazily on first use let indexing threads racing through that first use
+# see them half built (and extract no symbols or imports)
+_compile_patterns()
+_compile_import_patterns()
+
+
+# Languages that have symbol or import patterns
+_PARSEABLE_LANGUAGES = frozenset(_SYMBOL_PATTERNS) | frozenset(_IMPORT_PATTERNS)
+
 
 def extract_symbols(content: str, language: str) -> list[Symbol]:
     """Extract code symbols from file content using regex patterns."""
-    _compile_patterns()
-    patterns = _SYMBOL_PATTERNS.get(language, [])
-    if not patterns:
+    combined = _SYMBOL_COMBINED.get(language)
+    if combined is None:
         return []
+    literals = _SYMBOL_LITERALS.get(language)
+    if literals and not any(lit in content for lit in literals):
+        return []  # no keyword anywhere, so nothing can match
+    line_pattern, buffer_pattern, kinds = combined
 
     symbols = []
-    lines = content.splitlines()
-    for i, line in enumerate(lines, 1):
-        for kind, pattern in patterns:
-            m = pattern.match(line)
+    if _OTHER_LINE_BREAKS.search(content):
+        # Unusual line breaks: split exactly as splitlines() does
+        for i, line in enumerate(content.splitlines(), 1):
+            m = line_pattern.match(line)
             if m:
-                name = m.group(1)
+                kind, name_group = kinds[m.lastindex]
+                name = m.group(name_group)
                 if name and not name.startswith("_") or kind == "class":
                     symbols.append(Symbol(kind=kind, name=name, line=i))
-                break
+        return symbols
+
+    # Plain "\n" text: let the regex engine scan the whole buffer
+    fast = _SYMBOL_COMBINED_RE2.get(language)
+    if fast is not None and content.isascii() and "\x1f" not in content:
+        try:
+            return _scan_buffer(content, fast, kinds, _alternative_by_scan)
+        except Exception:
+            pass  # binding quirk — fall back to the stdlib scan
+    return _scan_buffer(content, buffer_pattern, kinds, _alternative_by_lastindex)
+
+
+def _alternative_by_lastindex(m, kinds: dict[int, tuple[str, int]]) -> tuple[str, int]:
+    return kinds[m.lastindex]
+
+
+def _alternative_by_scan(m, kinds: dict[int, tuple[str, int]]) -> tuple[str, int]:
+    # Engine-neutral: doesn't rely on lastindex semantics for nested groups
+    for group, entry in kinds.items():
+        if m.group(group) is not None:
+            return entry
+    raise ValueError("match without a participating alternative")
+
+
+def _scan_buffer(content: str, pattern, kinds: dict[int, tuple[str, int]],
+                 alternative) -> list[Symbol]:
+    """Run a whole-buffer MULTILINE symbol pattern over ``content``, counting
+    newlines only between consecutive matches."""
+    symbols = []
+    line_no, pos = 1, 0
+    for m in pattern.finditer(content):
+        start = m.start()
+        line_no += content.count("\n", pos, start)
+        pos = start
+        kind, name_group = alternative(m, kinds)
+        name = m.group(name_group)
+        if name and not name.startswith("_") or kind == "class":
+            symbols.append(Symbol(kind=kind, name=name, line=line_no))
     return symbols
 
 
+_SYMBOL_COMBINED_BYTES: dict[str, re.Pattern] = {}
+
+
+def _extract_symbols_bytes(buf, language: str) -> list[Symbol]:
+    """extract_symbols over a bytes-like buffer (e.g. an mmap) of plain ASCII,
+    LF-terminated text. Only the gaps between matches are ever copied."""
+    combined = _SYMBOL_COMBINED.get(language)
+    if combined is None:
+        return []
+    literals = _SYMBOL_LITERALS.get(language)
+    if literals and all(buf.find(lit.encode()) == -1 for lit in literals):
+        return []
+    pattern = _SYMBOL_COMBINED_BYTES.get(language)
+    if pattern is None:
+        pattern = re.compile(combined[1].pattern.encode("ascii"), re.MULTILINE)
+        _SYMBOL_COMBINED_BYTES[language] = pattern
+    kinds = combined[2]
+
+    symbols = []
+    line_no, pos = 1, 0
+    for m in pattern.finditer(buf):
+        start = m.start()
+        line_no += buf[pos:start].count(b"\n")
+        pos = start
+        kind, name_group = kinds[m.lastindex]
+        name = m.group(name_group).decode("ascii")
+        if name and not name.startswith("_") or kind == "class":
+            symbols.append(Symbol(kind=kind, name=name, line=line_no))
+    return symbols
+
+
+def _head_lines(content: str, n: int) -> list[str]:
+    """``content.splitlines()[:n]`` without splitting the whole file: split a
+    growing prefix until it holds more than ``n`` lines (so the first ``n``
+    are known to be complete) or covers everything."""
+    size = 8192
+    while True:
+        lines = content[:size].splitlines()
+        if len(lines) > n or size >= len(content):
+            return lines[:n]
+        size *= 4
+
+
+def _first_per_line(matches, text: str):
+    """Keep only the first of ``matches`` on each line of ``text``."""
+    last_line = None
+    for m in matches:
+        line_start = text.rfind("\n", 0, m.start())
+        if line_start != last_line:
+            last_line = line_start
+            yield m
+
+
 def extract_imports(content: str, language: str) -> list[str]:
     """Extract import/require statements from file content."""
-    _compile_import_patterns()
     pattern = _IMPORT_PATTERNS.get(language)
     if not pattern:
         return []
 
+    head = _HEAD_100_LINES.match(content).group()  # only scan top of file
+    # One substring test per character beats a character-class search here
+    if any(ch in head for ch in _OTHER_LINE_BREAK_CHARS):
+        # splitlines() would see more lines than the "\n"-based scan
+        matches = filter(None, map(pattern.search, _head_lines(content, 100)))
+    else:
+        buffer_pattern, anchored = _IMPORT_BUFFER_PATTERNS[language]
+        if anchored:
+            matches = buffer_pattern.finditer("\n" + head)
+        else:
+            matches = _first_per_line(buffer_pattern.finditer(head), head)
+
     imports = []
-    for line in content.splitlines()[:100]:  # only scan top of file
-        m = pattern.search(line)
-        if m:
-            val = m.group(1) or (m.group(2) if m.lastindex and m.lastindex >= 2 else None)
-            if val:
-                imports.append(val.strip())
+    for m in matches:
+        val = m.group(1) or (m.group(2) if m.lastindex and m.lastindex >= 2 else None)
+        if val:
+            imports.append(val.strip())
     return imports
 
 
@@ -235,46 +493,75 @@ def extract_imports(content: str, language: str) -> list[str]:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-class IgnoreRules:
-    """Loads and evaluates ignore patterns from .localaiignore, .gitignore, and defaults."""
+_IGNORE_FILES = (".localaiignore", ".localai/ignore", ".gitignore")
 
-    def __init__(self, workspace_root: str):
-        self.root = workspace_root
-        self.dir_patterns: set[str] = set(DEFAULT_SKIP_DIRS)
-        self.file_patterns: list[str] = []
-        self._load()
 
-    def _load(self):
-        for fname in (".localaiignore", ".localai/ignore", ".gitignore"):
-            path = os.path.join(self.root, fname)
-            if os.path.isfile(path):
-                self._parse_file(path)
+@functools.lru_cache(maxsize=32)
+def _load_ignore_rules(root: str, signature: tuple) -> tuple[frozenset[str], tuple[str, ...], Optional[re.Pattern]]:
+    """Parse the ignore files under ``root`` into (dirs, globs, compiled globs).
 
-    def _parse_file(self, path: str):
+    ``signature`` holds the (mtime_ns, size) of each ignore file, or None
+    when it is missing, so an edited file misses the cache and is re-read.
+    """
+    dir_patterns = set(DEFAULT_SKIP_DIRS)
+    file_patterns: list[str] = []
+    for fname, sig in zip(_IGNORE_FILES, signature):
+        if sig is None:
+            continue
         try:
-            with open(path, "r", encoding="utf-8", errors="replace") as f:
+            with open(os.path.join(root, fname), "r", encoding="utf-8", errors="replace") as f:
                 for line in f:
                     line = line.strip()
                     if not line or line.startswith("#"):
                         continue
                     if line.endswith("/"):
-                        self.dir_patterns.add(line.rstrip("/"))
+                        dir_patterns.add(line.rstrip("/"))
                     else:
-                        self.file_patterns.append(line)
+                        file_patterns.append(line)
         except OSError:
             pass
 
+    # All file globs as one regex (fnmatch semantics, incl. normcase)
+    file_re = None
+    if file_patterns:
+        file_re = re.compile("|".join(
+            fnmatch.translate(os.path.normcase(pat)) for pat in file_patterns
+        ))
+    dirs = DEFAULT_SKIP_DIRS if len(dir_patterns) == len(DEFAULT_SKIP_DIRS) else frozenset(dir_patterns)
+    return dirs, tuple(file_patterns), file_re
+
+
+def _ignore_signature(root: str) -> tuple:
+    signature = []
+    for fname in _IGNORE_FILES:
+        try:
+            st = os.stat(os.path.join(root, fname))
+        except OSError:
+            signature.append(None)
+            continue
+        signature.append((st.st_mtime_ns, st.st_size) if S_ISREG(st.st_mode) else None)
+    return tuple(signature)
+
+
+class IgnoreRules:
+    """Loads and evaluates ignore patterns from .localaiignore, .gitignore, and defaults."""
+
+    def __init__(self, workspace_root: str):
+        self.root = workspace_root
+        # Parsed rules are shared between instances until an ignore file changes
+        self.dir_patterns, self.file_patterns, self._file_re = _load_ignore_rules(
+            workspace_root, _ignore_signature(workspace_root)
+        )
+
     def should_skip_dir(self, dirname: str) -> bool:
         return dirname in self.dir_patterns
 
-    def should_skip_file(self, filename: str) -> bool:
-        ext = os.path.splitext(filename)[1].lower()
+    def should_skip_file(self, filename: str, ext: Optional[str] = None) -> bool:
+        if ext is None:
+            ext = os.path.splitext(filename)[1].lower()
         if ext in BINARY_EXTENSIONS:
             return True
-        for pat in self.file_patterns:
-            if fnmatch.fnmatch(filename, pat):
-                return True
-        return False
+        return self._file_re is not None and self._file_re.match(os.path.normcase(filename)) is not None
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -290,52 +577,37 @@ class Indexer:
         self.root = workspace_root
         self.ignore = ignore_rules or IgnoreRules(workspace_root)
         self.max_file_size = max_file_size  # skip files larger than this
+        # Set by scan(): the index it returned is exactly what the persisted
+        # cache already holds, so saving it again would rewrite the same data
+        self.cache_current = False
 
-    def scan(self) -> dict[str, FileInfo]:
-        """Full scan of the workspace. Returns {rel_path: FileInfo}."""
-        index: dict[str, FileInfo] = {}
-
-        for root, dirs, files in os.walk(self.root):
-            dirs[:] = [d for d in sorted(dirs) if not self.ignore.should_skip_dir(d)]
-
-            for fname in sorted(files):
-                if self.ignore.should_skip_file(fname):
-                    continue
-
-                abs_path = os.path.join(root, fname)
-                rel_path = os.path.relpath(abs_path, self.root).replace("\\", "/")
-
-                try:
-                    stat = os.stat(abs_path)
-                except OSError:
-                    continue
+    def scan(self, use_cache: bool = True) -> dict[str, FileInfo]:
+        """Full scan of the workspace. Returns {rel_path: FileInfo}.
 
-                if stat.st_size > self.max_file_size:
+        With ``use_cache``, files whose mtime and size match the persisted
+        index cache are rebuilt from it without being read or hashed.
+        """
+        cached = load_index_cache(self.root) if use_cache else {}
+        index: dict[str, FileInfo] = {}
+        jobs = []
+        for abs_path, rel_path, ext, stat in self._walk():
+            if stat is None or stat.st_size > self.max_file_size:
+                continue
+
+            entry = cached.get(rel_path)
+            if entry is not None:
+                info = _info_from_cache(abs_path, rel_path, ext, stat, entry)
+                if info is not None:
+                    index[rel_path] = info
                     continue
 
-                content_hash = self._hash_file(abs_path)
-                language = detect_language(abs_path)
-
-                # Read content for symbol extraction
-                content = self._safe_read(abs_path)
-                line_count = content.count("\n") + 1 if content else 0
-                symbols = extract_symbols(content, language) if content else []
-                imports = extract_imports(content, language) if content else []
-
-                info = FileInfo(
-                    abs_path=abs_path,
-                    rel_path=rel_path,
-                    extension=os.path.splitext(fname)[1].lower(),
-                    size=stat.st_size,
-                    content_hash=content_hash,
-                    last_modified=stat.st_mtime,
-                    line_count=line_count,
-                    symbols=symbols,
-                    imports=imports,
-                    language=language,
-                )
-                index[rel_path] = info
+            index[rel_path] = None  # keeps walk order; filled in below
+            jobs.append((abs_path, rel_path, ext, stat))
 
+        for info in self._index_files(jobs):
+            index[info.rel_path] = info
+        # Every file came from the cache, and every cached file was found
+        self.cache_current = use_cache and not jobs and len(index) == len(cached)
         return index
 
     def rescan_changed(self, old_index: dict[str, FileInfo]) -> tuple[dict[str, FileInfo], list[str], list[str]]:
@@ -343,83 +615,202 @@ class Indexer:
         new_index: dict[str, FileInfo] = {}
         changed: list[str] = []
         current_paths: set[str] = set()
+        jobs = []
+
+        for abs_path, rel_path, ext, stat in self._walk():
+            current_paths.add(rel_path)
+            if stat is None or stat.st_size > self.max_file_size:
+                continue
+
+            old_info = old_index.get(rel_path)
+            if old_info and old_info.last_modified == stat.st_mtime and old_info.size == stat.st_size:
+                # Keyed by the entry's own path string rather than the one
+                # just built by the walk, so an unchanged file keeps a single
+                # copy of its path across refreshes
+                new_index[old_info.rel_path] = old_info
+                continue
+
+            # File is new or changed — re-index it. The placeholder keeps the
+            # index in walk order; it is filled in below.
+            new_index[rel_path] = None
+            jobs.append((abs_path, rel_path, ext, stat))
+
+        for info in self._index_files(jobs):
+            new_index[info.rel_path] = info
+            old_info = old_index.get(info.rel_path)
+            if old_info is None or old_info.content_hash != info.content_hash:
+                changed.append(info.rel_path)
 
-        for root, dirs, files in os.walk(self.root):
-            dirs[:] = [d for d in sorted(dirs) if not self.ignore.should_skip_dir(d)]
-
-            for fname in sorted(files):
-                if self.ignore.should_skip_file(fname):
-                    continue
-
-                abs_path = os.path.join(root, fname)
-                rel_path = os.path.relpath(abs_path, self.root).replace("\\", "/")
-                current_paths.add(rel_path)
+        removed = [p for p in old_index if p not in current_paths]
+        return new_index, changed, removed
 
+    def _walk(self):
+        """Yield (abs_path, rel_path, lowercased extension, stat) for every
+        non-ignored file, depth-first in sorted order. ``stat`` is None if the
+        file can't be stat'ed (e.g. a broken symlink).
+
+        Uses os.scandir directly: directory entries carry their type, so no
+        per-entry syscall is needed to tell files from directories, and
+        DirEntry.stat() reuses what the directory read returned where the
+        platform provides it (Windows). Symlinked directories are not
+        followed, matching os.walk's default.
+        """
+        stack = [(self.root, "")]
+        while stack:
+            dirpath, rel_prefix = stack.pop()
+            try:
+                with os.scandir(dirpath) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                name = entry.name
                 try:
-                    stat = os.stat(abs_path)
+                    is_dir = entry.is_dir()
                 except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not self.ignore.should_skip_dir(name) and not entry.is_symlink():
+                        subdirs.append((entry.path, rel_prefix + name + "/"))
                     continue
 
-                if stat.st_size > self.max_file_size:
-                    continue
-
-                old_info = old_index.get(rel_path)
-                if old_info and old_info.last_modified == stat.st_mtime and old_info.size == stat.st_size:
-                    new_index[rel_path] = old_info
+                ext = os.path.splitext(name)[1].lower()
+                if self.ignore.should_skip_file(name, ext):
                     continue
-
-                # File is new or changed — re-index it
-                content_hash = self._hash_file(abs_path)
-                language = detect_language(abs_path)
-                content = self._safe_read(abs_path)
-                line_count = content.count("\n") + 1 if content else 0
-                symbols = extract_symbols(content, language) if content else []
-                imports = extract_imports(content, language) if content else []
-
-                info = FileInfo(
-                    abs_path=abs_path,
-                    rel_path=rel_path,
-                    extension=os.path.splitext(fname)[1].lower(),
-                    size=stat.st_size,
-                    content_hash=content_hash,
-                    last_modified=stat.st_mtime,
-                    line_count=line_count,
-                    symbols=symbols,
-                    imports=imports,
-                    language=language,
-                )
-                new_index[rel_path] = info
-
-                if old_info is None or old_info.content_hash != content_hash:
-                    changed.append(rel_path)
-
-        removed = [p for p in old_index if p not in current_paths]
-        return new_index, changed, removed
-
-    def _hash_file(self, filepath: str) -> str:
-        """Compute a fast content hash (MD5) for change detection."""
-        h = hashlib.md5()
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    stat = None
+                yield entry.path, rel_prefix + name, ext, stat
+
+            stack.extend(reversed(subdirs))
+
+    def _index_files(self, jobs: list[tuple]) -> list[FileInfo]:
+        """Index files, in order. Large batches fan out over a thread pool:
+        file reads and hashing release the GIL, so the I/O overlaps."""
+        if len(jobs) < _PARALLEL_MIN_FILES:
+            return [self._index_file(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+            return list(pool.map(self._index_file, jobs))
+
+    def _index_file(self, job: tuple) -> FileInfo:
+        """Hash, read and extract symbols for one (abs_path, rel_path, ext, stat)."""
+        abs_path, rel_path, ext, stat = job
+        language = detect_language(abs_path, ext)
+        # Languages without symbol/import patterns are hashed and line-counted
+        # from the raw bytes; their text is never decoded or scanned.
+        parseable = language in _PARSEABLE_LANGUAGES
+
+        scanned = None
+        if parseable and stat.st_size >= _MMAP_MIN_SIZE:
+            scanned = self._scan_mmap(abs_path, language)
+        if scanned is not None:
+            content_hash, line_count, symbols, imports = scanned
+        else:
+            content_hash, content, line_count = self._read_and_hash(abs_path, stat.st_size, parseable)
+            symbols = extract_symbols(content, language) if content else []
+            imports = extract_imports(content, language) if content else []
+
+        return FileInfo(
+            abs_path=abs_path,
+            rel_path=rel_path,
+            extension=ext,
+            size=stat.st_size,
+            content_hash=content_hash,
+            last_modified=stat.st_mtime,
+            line_count=line_count,
+            symbols=symbols,
+            imports=imports,
+            language=language,
+        )
+
+    def _read_and_hash(self, filepath: str, size: int,
+                       decode: bool = True) -> tuple[str, str, int]:
+        """Read a file once, returning (content hash, decoded text, line count).
+
+        The hash (see HASH_ALGO) is over the raw bytes. The text is decoded as
+        UTF-8 with replacement and newline-normalised, exactly as a text-mode
+        open() would return it; with ``decode=False`` it is "" (the line count
+        is still exact). Returns ("", "", 0) if the file can't be read.
+        """
+        h = _new_hasher()
         try:
             with open(filepath, "rb") as f:
-                while chunk := f.read(65536):
-                    h.update(chunk)
+                if size <= _READ_ONCE_LIMIT:
+                    data = f.read()
+                    h.update(data)
+                    if not decode:
+                        return h.hexdigest(), "", _count_lines(data)
+                    content = data.decode("utf-8", errors="replace")
+                else:
+                    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                    parts = []
+                    while chunk := f.read(_STREAM_CHUNK):
+                        h.update(chunk)
+                        parts.append(decoder.decode(chunk))
+                    parts.append(decoder.decode(b"", final=True))
+                    content = "".join(parts)
         except OSError:
-            return ""
-        return h.hexdigest()
+            return "", "", 0
+
+        if "\r" in content:
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
+        line_count = content.count("\n") + 1 if content else 0
+        return h.hexdigest(), content if decode else "", line_count
+
 
-    def _safe_read(self, filepath: str) -> str:
-        """Read file content safely, returning empty string on failure."""
+    def _scan_mmap(self, filepath: str, language: str) -> Optional[tuple[str, int, list[Symbol], list[str]]]:
+        """Hash and scan a large source file through mmap, returning
+        (content hash, line count, symbols, imports).
+
+        Returns None — use the str path — unless the file is plain ASCII with
+        LF line endings, where byte regexes match exactly what the str ones
+        would.
+        """
         try:
-            with open(filepath, "r", encoding="utf-8", errors="replace") as f:
-                return f.read()
-        except (OSError, PermissionError):
-            return ""
+            with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if _NOT_PLAIN_ASCII.search(mm):
+                    return None
+                h = _new_hasher()
+                h.update(mm)
+                symbols = _extract_symbols_bytes(mm, language)
+
+                size = len(mm)
+                newlines = 0
+                for i in range(0, size, _STREAM_CHUNK):
+                    newlines += mm[i:i + _STREAM_CHUNK].count(b"\n")
+
+                # extract_imports only looks at the first 100 lines
+                end = -1
+                for _ in range(100):
+                    end = mm.find(b"\n", end + 1)
+                    if end == -1:
+                        break
+                head = (mm[:end] if end != -1 else mm[:]).decode("ascii")
+                imports = extract_imports(head, language)
+        except (OSError, ValueError):
+            return None
+        return h.hexdigest(), newlines + 1 if size else 0, symbols, imports
+
+
+def _count_lines(data: bytes) -> int:
+    """Line count of raw bytes as text-mode reading would see it (CRLF, CR
+    and LF each end a line), without decoding."""
+    if not data:
+        return 0
+    return data.count(b"\n") + data.count(b"\r") - data.count(b"\r\n") + 1
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  CACHE PERSISTENCE (saves index to .localai/cache/ to avoid full rescans)
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Bump when the cached fields or symbol/import extraction change, so scan()
+# never reuses entries produced by older code
+INDEX_CACHE_VERSION = 3
+
 
 def save_index_cache(workspace_root: str, index: dict[str, FileInfo]):
     """Persist index hashes to disk for fast incremental rescans."""
@@ -427,31 +818,78 @@ def save_index_cache(workspace_root: str, index: dict[str, FileInfo]):
     os.makedirs(cache_dir, exist_ok=True)
     cache_path = os.path.join(cache_dir, "index.json")
 
-    data = {}
+    files = {}
     for rel_path, info in index.items():
-        data[rel_path] = {
+        files[rel_path] = {
             "hash": info.content_hash,
             "mtime": info.last_modified,
             "size": info.size,
             "language": info.language,
             "line_count": info.line_count,
-            "symbols": [{"kind": s.kind, "name": s.name, "line": s.line} for s in info.symbols],
+            "symbols": [[s.kind, s.name, s.line] for s in info.symbols],
+            "imports": info.imports,
         }
+    data = {"version": INDEX_CACHE_VERSION, "algo": HASH_ALGO, "files": files}
 
     try:
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=1)
+        if orjson is not None:
+            with open(cache_path, "wb") as f:
+                f.write(orjson.dumps(data))
+        else:
+            with open(cache_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
     except OSError:
         pass
 
 
 def load_index_cache(workspace_root: str) -> dict[str, dict]:
-    """Load cached index data from disk. Returns empty dict if no cache."""
+    """Load cached index data from disk. Returns empty dict if there is no
+    cache or it was written in another format or with another hash algorithm."""
     cache_path = os.path.join(workspace_root, ".localai", "cache", "index.json")
     if not os.path.isfile(cache_path):
         return {}
     try:
-        with open(cache_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (OSError, json.JSONDecodeError):
+        with open(cache_path, "rb") as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except (OSError, ValueError):
+        return {}
+    if (not isinstance(data, dict) or data.get("version") != INDEX_CACHE_VERSION
+            or data.get("algo") != HASH_ALGO):
         return {}
+    return data.get("files", {})
+
+
+def _info_from_cache(abs_path: str, rel_path: str, ext: str, stat: os.stat_result,
+                     entry: dict) -> Optional[FileInfo]:
+    """Rebuild a FileInfo from an index-cache entry if the file's mtime and
+    size still match it. Returns None on a mismatch or an incomplete entry."""
+    try:
+        if entry["mtime"] != stat.st_mtime or entry["size"] != stat.st_size:
+            return None
+    except (KeyError, TypeError):
+        return None
+    return _info_from_entry(abs_path, rel_path, ext, entry)
+
+
+def _info_from_entry(abs_path: str, rel_path: str, ext: str, entry: dict) -> Optional[FileInfo]:
+    """Rebuild a FileInfo from an index-cache entry as recorded, without
+    checking the file. Returns None for an incomplete entry."""
+    try:
+        return FileInfo(
+            abs_path=abs_path,
+            rel_path=rel_path,
+            extension=ext,
+            size=entry["size"],
+            content_hash=entry["hash"],
+            last_modified=entry["mtime"],
+            line_count=entry["line_count"],
+            symbols=[Symbol(kind=kind, name=name, line=line) for kind, name, line in entry["symbols"]],
+            imports=entry["imports"],
+            # The JSON decoder makes a new string per entry; interning gives
+            # all files of a language one shared object, so counting and
+            # comparing languages hits the identity fast path
+            language=sys.intern(entry["language"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
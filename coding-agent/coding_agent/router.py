@@ -6,7 +6,12 @@ import json
 import re
 from dataclasses import dataclass
 
-from .config import GEMINI_API_KEY, MODEL_TIERS
+from .config import GEMINI_API_KEY, get_tier
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  TASK PROFILE — output of the router
@@ -110,12 +115,12 @@ def _classify_with_gemini(task: str) -> TaskProfile | None:
         if complexity not in ("low", "medium", "high"):
             complexity = "medium"
 
-        tier = MODEL_TIERS[complexity]
+        tier = get_tier(complexity)
         return TaskProfile(
             complexity=complexity,
-            model=tier["model"],
-            max_tokens=tier["max_tokens"],
-            max_iterations=tier["max_iterations"],
+            model=tier.model,
+            max_tokens=tier.max_tokens,
+            max_iterations=tier.max_iterations,
             reasoning=reasoning,
         )
 
@@ -141,14 +146,41 @@ _LOW_KEYWORDS = [
 ]
 
 
+def _build_keyword_automaton():
+    """One Aho-Corasick automaton over both keyword lists (pyahocorasick only)."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for kw in _HIGH_KEYWORDS:
+        automaton.add_word(kw, (kw, True))
+    for kw in _LOW_KEYWORDS:
+        automaton.add_word(kw, (kw, False))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AC = _build_keyword_automaton()
+
+
+def _keyword_scores(task_lower: str) -> tuple[int, int]:
+    """Return how many distinct high / low keywords occur in the task."""
+    if _KEYWORD_AC is None:
+        high = sum(1 for kw in _HIGH_KEYWORDS if kw in task_lower)
+        low = sum(1 for kw in _LOW_KEYWORDS if kw in task_lower)
+        return high, low
+
+    # Single pass over the text; repeats of a keyword still count once
+    found = {value for _, value in _KEYWORD_AC.iter(task_lower)}
+    high = sum(1 for _, is_high in found if is_high)
+    return high, len(found) - high
+
+
 def _classify_local(task: str) -> TaskProfile:
     """Keyword-based complexity classifier — free, instant, no API."""
     task_lower = task.lower()
     task_len = len(task)
 
-    # Check high-complexity keywords
-    high_score = sum(1 for kw in _HIGH_KEYWORDS if kw in task_lower)
-    low_score = sum(1 for kw in _LOW_KEYWORDS if kw in task_lower)
+    high_score, low_score = _keyword_scores(task_lower)
 
     if high_score >= 2 or (high_score >= 1 and task_len > 300):
         complexity = "high"
@@ -160,11 +192,11 @@ def _classify_local(task: str) -> TaskProfile:
         complexity = "medium"
         reasoning = "Task classified as medium by default (local heuristic)."
 
-    tier = MODEL_TIERS[complexity]
+    tier = get_tier(complexity)
     return TaskProfile(
         complexity=complexity,
-        model=tier["model"],
-        max_tokens=tier["max_tokens"],
-        max_iterations=tier["max_iterations"],
+        model=tier.model,
+        max_tokens=tier.max_tokens,
+        max_iterations=tier.max_iterations,
         reasoning=reasoning,
     )
@@ -1,14 +1,32 @@
 # Copyright (c) 2026 — See LICENSE file for details.
 """Tool definitions and execution for the coding agent."""
 
+import io
 import os
 import re
 import ast
 import json
+import mmap
+import codecs
+import shutil
 import fnmatch
+import itertools
+import threading
 import subprocess
 import traceback
-from typing import Optional, Callable
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Iterable
+
+try:
+    import re2  # optional: google-re2, linear-time pre-checks in search_files
+except ImportError:
+    re2 = None
+
+try:
+    from re import _parser as _re_parser  # Python 3.11+
+except ImportError:
+    import sre_parse as _re_parser
 
 # ═══════════════════════════════════════════════════════════════════════════════
 #  TOOL SCHEMAS  (sent to the Claude API)
@@ -221,6 +239,7 @@ TOOL_DEFINITIONS = [
 #  SKIP PATTERNS  (reuse from indexer for consistency)
 # ═══════════════════════════════════════════════════════════════════════════════
 
+from .config import MAX_TOOL_OUTPUT_CHARS
 from .indexer import DEFAULT_SKIP_DIRS as SKIP_DIRS, BINARY_EXTENSIONS
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -260,14 +279,17 @@ def execute_tool(name: str, params: dict, working_dir: str) -> dict:
         result = handler(params, working_dir)
         
         # --- GLOBAL TOKEN FIREWALL ---
-        if "output" in result:
-            out_str = str(result["output"])
-            if len(out_str) > 30000:
+        out_str = result.get("output")
+        if out_str is not None:
+            if not isinstance(out_str, str):
+                out_str = str(out_str)
+            if len(out_str) > MAX_TOOL_OUTPUT_CHARS:
                 result["output"] = (
-                    out_str[:30000] + 
-                    "\n\n[SYSTEM WARNING: TOOL OUTPUT TRUNCATED TO 30000 CHARACTERS TO PREVENT TOKEN EXPLOSION. "
+                    out_str[:MAX_TOOL_OUTPUT_CHARS] +
+                    f"\n\n[SYSTEM WARNING: TOOL OUTPUT TRUNCATED TO {MAX_TOOL_OUTPUT_CHARS} CHARACTERS TO PREVENT TOKEN EXPLOSION. "
                     "USE STRICT LIMIT/OFFSET OR TIGHTER SEARCH QUERIES.]"
                 )
+                result["truncated_chars"] = len(out_str) - MAX_TOOL_OUTPUT_CHARS
                 
         return result
     except Exception as exc:
@@ -296,8 +318,11 @@ def _list_directory(params: dict, working_dir: str) -> dict:
     lines: list[str] = []
 
     def _walk(dir_path: str, prefix: str, depth: int):
+        # DirEntry knows from the directory read whether it is a directory,
+        # so only files need a stat (for their size)
         try:
-            entries = sorted(os.listdir(dir_path))
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
         except PermissionError:
             lines.append(f"{prefix}[permission denied]")
             return
@@ -305,27 +330,24 @@ def _list_directory(params: dict, working_dir: str) -> dict:
         dirs = []
         files = []
         for e in entries:
-            full = os.path.join(dir_path, e)
-            if os.path.isdir(full):
-                if e not in SKIP_DIRS:
+            if _is_dir(e):
+                if e.name not in SKIP_DIRS:
                     dirs.append(e)
             else:
                 files.append(e)
 
         for d in dirs:
-            full = os.path.join(dir_path, d)
-            count = _count_items(full)
-            lines.append(f"{prefix}{d}/  ({count} items)")
+            count = _count_items(d.path)
+            lines.append(f"{prefix}{d.name}/  ({count} items)")
             if recursive and depth < max_depth:
-                _walk(full, prefix + "  ", depth + 1)
+                _walk(d.path, prefix + "  ", depth + 1)
 
         for f in files:
-            full = os.path.join(dir_path, f)
             try:
-                size = os.path.getsize(full)
-                lines.append(f"{prefix}{f}  ({_human_size(size)})")
+                size = f.stat().st_size
+                lines.append(f"{prefix}{f.name}  ({_human_size(size)})")
             except OSError:
-                lines.append(f"{prefix}{f}")
+                lines.append(f"{prefix}{f.name}")
 
         if len(lines) > 2000:
             return
@@ -345,16 +367,85 @@ def _count_items(dirpath: str) -> int:
         return 0
 
 
+def _glob_matcher(pattern: str) -> Callable[[str], object]:
+    """``fnmatch.fnmatch(name, pattern)`` compiled once: the returned call is
+    truthy for matching names, with no per-name pattern cache lookup."""
+    match = re.compile(fnmatch.translate(os.path.normcase(pattern))).match
+    if os.path.normcase("A") == "A":
+        return match  # POSIX: normcase is the identity
+    return lambda name: match(os.path.normcase(name))
+
+
+def _glob_filter(pattern: str) -> Callable[[list[str]], Iterable[str]]:
+    """Return a function that yields the names in a list matching ``pattern``.
+    The filtering runs in C via ``filter``, and the ``"*"`` default passes
+    names through untested."""
+    if pattern == "*":
+        return lambda names: names
+    match = _glob_matcher(pattern)
+    return lambda names: filter(match, names)
+
+
+def _is_dir(entry: os.DirEntry) -> bool:
+    """``os.path.isdir`` for a DirEntry (follows symlinks, False on error)."""
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def _walk_tree(top: str, skip_dirs: frozenset[str] = frozenset()):
+    """``os.walk(top)`` (top-down, symlinked directories listed but not
+    entered), minus the extra lstat os.walk makes per subdirectory: the
+    DirEntry already says whether it is a symlink. Subdirectories named in
+    ``skip_dirs`` are left out of ``dirs``, so never entered; ``top`` itself
+    is walked whatever its name. Callers may prune ``dirs`` in place."""
+    is_dir, join = _is_dir, os.path.join  # looked up once, not per entry
+    stack = [top]
+    while stack:
+        root = stack.pop()
+        try:
+            with os.scandir(root) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        dirs: list[str] = []
+        files: list[str] = []
+        links: set[str] = set()
+        for entry in entries:
+            name = entry.name
+            if is_dir(entry):
+                if name in skip_dirs:
+                    continue
+                dirs.append(name)
+                if entry.is_symlink():
+                    links.add(name)
+            else:
+                files.append(name)
+
+        yield root, dirs, files
+        stack.extend(join(root, d) for d in reversed(dirs) if d not in links)
+
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+
 def _human_size(n: int) -> str:
-    for unit in ("B", "KB", "MB", "GB"):
-        if n < 1024:
-            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
-        n /= 1024
-    return f"{n:.1f} TB"
+    if n < 1024:
+        return f"{n} B"
+    if n < 1 << 20:
+        return f"{n / 1024:.1f} KB"  # most source files
+    # The largest unit the size is at least 1 of: each is 10 more bits
+    power = min((n.bit_length() - 1) // 10, 4)
+    return f"{n / (1 << 10 * power):.1f} {_SIZE_UNITS[power]}"
 
 
 # ── read_file ───────────────────────────────────────────────────────────────
 
+# Block size for counting the lines of a file past the part that is shown
+_READ_BLOCK_CHARS = 1 << 20
+
 
 def _read_file(params: dict, working_dir: str) -> dict:
     path = _resolve_path(params["path"], working_dir)
@@ -366,12 +457,6 @@ def _read_file(params: dict, working_dir: str) -> dict:
     if ext in BINARY_EXTENSIONS:
         return {"output": f"Binary file ({ext}): {path}", "is_error": True}
 
-    try:
-        with open(path, "r", encoding="utf-8", errors="replace") as f:
-            all_lines = f.readlines()
-    except Exception as exc:
-        return {"output": f"Cannot read {path}: {exc}", "is_error": True}
-
     offset = params.get("offset")
     limit = params.get("limit")
 
@@ -382,27 +467,72 @@ def _read_file(params: dict, working_dir: str) -> dict:
 
     start_idx = offset - 1
     end_idx = start_idx + limit
-    
-    selected = all_lines[start_idx:end_idx]
-    
-    numbered = []
-    for i, line in enumerate(selected, start=offset):
-        numbered.append(f"{i:>5}\t{line.rstrip()}")
 
-    header = f"File: {path}  ({len(all_lines)} lines total)\n"
-    body = "\n".join(numbered)
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            skipped = sum(1 for _ in itertools.islice(f, start_idx))
+            selected = list(itertools.islice(f, limit))
+            total = skipped + len(selected) + _count_remaining_lines(f)
+    except Exception as exc:
+        return {"output": f"Cannot read {path}: {exc}", "is_error": True}
+
+    header = f"File: {path}  ({total} lines total)\n"
+    body = "\n".join([
+        f"{i:>5}\t{line.rstrip()}" for i, line in enumerate(selected, start=offset)
+    ])
     
-    if end_idx < len(all_lines):
-        body += f"\n\n… ({len(all_lines) - end_idx} more lines in file)"
+    if end_idx < total:
+        body += f"\n\n… ({total - end_idx} more lines in file)"
         
     return {"output": header + body, "is_error": False}
+
+
+def _count_remaining_lines(f) -> int:
+    """Count the lines left in text file ``f`` without keeping them, reading
+    in blocks so a huge log never has to be held in memory at once."""
+    count = 0
+    last = ""
+    while block := f.read(_READ_BLOCK_CHARS):
+        count += block.count("\n")
+        last = block[-1]
+    return count + (last not in ("", "\n"))
+
+
+# Parent directories write_file has already created or found, so repeated
+# writes into the same tree skip the makedirs walk
+_ensured_dirs: set[str] = set()
+
+# Binary on every platform, so "\n" is written as-is (newline="\n")
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    """Replace the contents of ``path`` with ``data`` straight through the
+    file descriptor, without a buffered text wrapper in between."""
+    fd = os.open(path, _WRITE_FLAGS, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
 def _write_file(params: dict, working_dir: str) -> dict:
     path = _resolve_path(params["path"], working_dir)
     content = params["content"]
 
-    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with open(path, "w", encoding="utf-8", newline="\n") as f:
-        f.write(content)
+    parent = os.path.dirname(path) or "."
+    if parent not in _ensured_dirs:
+        os.makedirs(parent, exist_ok=True)
+        _ensured_dirs.add(parent)
+    data = content.encode("utf-8")
+    try:
+        _write_bytes(path, data)
+    except FileNotFoundError:
+        # The directory went away since (e.g. a shell command removed it)
+        os.makedirs(parent, exist_ok=True)
+        _write_bytes(path, data)
 
     _notify_change(path)
 
@@ -410,7 +540,6 @@ def _write_file(params: dict, working_dir: str) -> dict:
     return {
         "output": f"Wrote {line_count} lines to {path}",
         "is_error": False,
-        "diff_info": {"path": path, "old": None, "new": content},
     }
 
 
@@ -427,27 +556,25 @@ def _edit_file(params: dict, working_dir: str) -> dict:
         return {"output": f"File not found: {path}", "is_error": True}
 
     with open(path, "r", encoding="utf-8", errors="replace") as f:
-        lines = f.readlines()
+        original = f.read()
 
-    if start_line < 1 or end_line > len(lines) or start_line > end_line:
+    # Same count readlines() would give: a final line needs no newline
+    line_count = original.count("\n") + (original[-1:] not in ("", "\n"))
+    if start_line < 1 or end_line > line_count or start_line > end_line:
         return {
-            "output": f"Invalid line range: {start_line}-{end_line}. File has {len(lines)} lines.", 
+            "output": f"Invalid line range: {start_line}-{end_line}. File has {line_count} lines.", 
             "is_error": True
         }
 
-    original = "".join(lines)
-    
-    start_idx = start_line - 1
-    end_idx = end_line
+    start_idx = _line_offset(original, start_line - 1)
+    end_idx = _line_offset(original, end_line)
     
     if new_content and not new_content.endswith('\n'):
         new_content += '\n'
         
-    updated_lines = lines[:start_idx] + [new_content] + lines[end_idx:]
-    updated = "".join(updated_lines)
+    updated = original[:start_idx] + new_content + original[end_idx:]
 
-    with open(path, "w", encoding="utf-8", newline="\n") as f:
-        f.write(updated)
+    _write_bytes(path, updated.encode("utf-8"))
 
     _notify_change(path)
 
@@ -462,6 +589,29 @@ def _edit_file(params: dict, working_dir: str) -> dict:
         "diff_info": {"path": path, "old": original, "new": updated},
     }
 
+
+def _line_offset(text: str, n: int) -> int:
+    """Offset of the first character after the ``n``-th newline of ``text``
+    (0 for n == 0), or len(text) if it has fewer. Whole blocks of lines are
+    skipped with count(), so only the last few are located one at a time."""
+    pos = 0
+    block = 4096
+    while n:
+        end = pos + block
+        if end < len(text):
+            in_block = text.count("\n", pos, end)
+            if in_block < n:
+                n -= in_block
+                pos = end
+                continue
+        i = text.find("\n", pos)
+        if i == -1:
+            return len(text)
+        pos = i + 1
+        n -= 1
+    return pos
+
+
 def _delete_file(params: dict, working_dir: str) -> dict:
     path = _resolve_path(params["path"], working_dir)
 
@@ -472,6 +622,8 @@ def _delete_file(params: dict, working_dir: str) -> dict:
     elif os.path.isdir(path):
         try:
             os.rmdir(path)
+            _ensured_dirs.difference_update(
+                [d for d in _ensured_dirs if d == path or d.startswith(path + os.sep)])
             return {"output": f"Deleted empty directory: {path}", "is_error": False}
         except OSError:
             return {"output": f"Directory not empty: {path}", "is_error": True}
@@ -481,6 +633,45 @@ def _delete_file(params: dict, working_dir: str) -> dict:
 
 # ── search_files ────────────────────────────────────────────────────────────
 
+# Directory searches over at least this many files read them on a thread
+# pool (multi-core machines only): file reads release the GIL, so the I/O
+# overlaps
+_SEARCH_PARALLEL_MIN_FILES = 32
+
+# Files up to this many characters are read whole and pre-checked in one scan
+_WHOLE_FILE_CHARS = 8 << 20
+
+# Files at least this big are pre-checked for a plain case-sensitive query
+# through mmap, searching the page cache without decoding a copy
+_MMAP_MIN_BYTES = 64 << 10
+
+# Regex syntax whose match can depend on text beyond the line it is in
+_LINE_BOUND_SYNTAX = re.compile(r"\\[AZ]|\(\?<?[=!]")
+
+# google-re2, when installed and not disabled with USE_RE2=0, runs the
+# whole-file pre-check. RE2 has no backreferences or lookarounds (those
+# patterns keep using re) and its \w, \s and \b are ASCII-only, so it only
+# sees ASCII text without the controls Python's \s also matches.
+_USE_RE2 = re2 is not None and os.getenv("USE_RE2", "1") != "0"
+_RE2_UNSAFE_CHARS = "\v\x1c\x1d\x1e\x1f"
+
+# ripgrep, when installed, runs the search; the Python walk is the fallback
+_RG = shutil.which("rg")
+
+# Make rg look at the same files as the Python walk: ignore files are not
+# honoured, hidden files are searched, files holding NUL bytes are searched
+# as text rather than skipped, and the shared skip lists apply. No --sort:
+# it would make rg search single-threaded; the results it returns are sorted
+# afterwards instead. Plain "path NUL line:text" output is parsed rather
+# than --json, whose summary only counts the files that matched.
+_RG_FLAGS = [
+    "--no-config", "--no-ignore", "--hidden", "--crlf", "--color", "never",
+    "--text", "--with-filename", "--line-number", "--no-heading", "--null", "--stats",
+    *[arg for name in sorted(SKIP_DIRS) for arg in ("--glob", f"!{name}/")],
+    *[arg for ext in sorted(BINARY_EXTENSIONS) for arg in ("--iglob", f"!*{ext}")],
+]
+_RG_FILES_SEARCHED = re.compile(rb"^(\d+) files searched$")
+
 
 def _search_files(params: dict, working_dir: str) -> dict:
     query = params["query"]
@@ -489,51 +680,82 @@ def _search_files(params: dict, working_dir: str) -> dict:
     case_sensitive = params.get("case_sensitive", False)
     fixed_strings = params.get("fixed_strings", False)
 
+    # ``may_match`` is tried on a whole file first: if it is false, no line
+    # of the file can match, so most files never get split into lines.
+    # ``needle``, when set, lets large files be ruled out on their raw bytes.
+    needle = None
     if fixed_strings:
         if case_sensitive:
             def match(line):
                 return query in line
+            may_match = match
+            needle = _byte_needle(query)
         else:
             q_lower = query.lower()
             def match(line):
                 return q_lower in line.lower()
+            may_match = match
     else:
         flags = 0 if case_sensitive else re.IGNORECASE
         try:
-            pattern = re.compile(query, flags)
+            match = re.compile(query, flags).search  # a Match or None is truthy enough
         except re.error as exc:
             return {"output": f"Invalid regex: {exc}", "is_error": True}
-        def match(line):
-            return pattern.search(line) is not None
+        # With MULTILINE, ^ and $ match wherever they would in a single line.
+        # Lookarounds and \A / \Z can see past a line, so those skip the check,
+        # and so does a pattern that can consume a "\n": a line keeps its
+        # newline, after which $ holds at the end of the line but not before
+        # the next line of the whole file.
+        may_match = None
+        if not _LINE_BOUND_SYNTAX.search(query) and not _can_match_newline(query, flags):
+            may_match = _with_re2(query, case_sensitive, re.compile(query, flags | re.MULTILINE).search)
 
     results: list[str] = []
     files_searched = 0
     max_results = 200
 
-    def _should_include(filename):
-        return fnmatch.fnmatch(filename, file_pattern)
+    _matching = _glob_filter(file_pattern)
 
-    if os.path.isfile(search_path):
-        _search_single_file(search_path, match, results, max_results)
+    if not os.path.isfile(search_path) and not os.path.isdir(search_path):
+        return {"output": f"Path not found: {search_path}", "is_error": True}
+
+    found = None
+    # [: is a POSIX class and {,n} may be read differently by rg than by re
+    if _RG is not None and (fixed_strings or ("[:" not in query and "{," not in query)):
+        found = _search_with_ripgrep(query, search_path, file_pattern,
+                                     case_sensitive, fixed_strings, max_results)
+    if found is not None:
+        results, files_searched = found
+    elif os.path.isfile(search_path):
+        results = list(itertools.islice(
+            _iter_file_matches(search_path, match, may_match, needle), max_results))
         files_searched = 1
-    elif os.path.isdir(search_path):
-        for root, dirs, files in os.walk(search_path):
-            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
-            for fname in files:
-                if not _should_include(fname):
-                    continue
-                ext = os.path.splitext(fname)[1].lower()
-                if ext in BINARY_EXTENSIONS:
-                    continue
-                full = os.path.join(root, fname)
-                _search_single_file(full, match, results, max_results)
-                files_searched += 1
-                if len(results) >= max_results:
-                    break
-            if len(results) >= max_results:
-                break
     else:
-        return {"output": f"Path not found: {search_path}", "is_error": True}
+        def candidates():
+            splitext, join = os.path.splitext, os.path.join
+            for root, dirs, files in _walk_tree(search_path, SKIP_DIRS):
+                for fname in _matching(files):
+                    if splitext(fname)[1].lower() in BINARY_EXTENSIONS:
+                        continue
+                    yield join(root, fname)
+
+        def search(path):
+            return _iter_file_matches(path, match, may_match, needle)
+
+        def search_now(path):
+            return list(itertools.islice(search(path), max_results))
+
+        paths = candidates()
+        cpus = os.cpu_count() or 1
+        head = list(itertools.islice(paths, _SEARCH_PARALLEL_MIN_FILES))
+        if cpus == 1 or len(head) < _SEARCH_PARALLEL_MIN_FILES:
+            results, files_searched = _first_matches(
+                map(search, itertools.chain(head, paths)), max_results)
+        else:
+            workers = min(32, cpus * 4)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                per_file = _map_ahead(pool, search_now, itertools.chain(head, paths), workers * 2)
+                results, files_searched = _first_matches(per_file, max_results)
 
     header = f"Searched {files_searched} file(s) | {len(results)} match(es)\n\n"
     if not results:
@@ -544,14 +766,212 @@ def _search_files(params: dict, working_dir: str) -> dict:
     return {"output": header + body, "is_error": False}
 
 
-def _search_single_file(filepath, match_fn, results, max_results):
+def _with_re2(query: str, case_sensitive: bool, fallback: Callable) -> Callable:
+    """The MULTILINE ``fallback`` search, with RE2 doing the scan where it
+    agrees with re. RE2 runs in linear time, so a pathological pattern can't
+    stall on a file that doesn't match."""
+    # [: is a POSIX class and {,n} a literal to RE2, but not to re
+    if not _USE_RE2 or not query.isascii() or "[:" in query or "{," in query:
+        return fallback
+    try:
+        fast = re2.compile(("(?m)" if case_sensitive else "(?im)") + query).search
+    except Exception:
+        return fallback  # syntax RE2 doesn't support
+
+    def may_match(text):
+        if text.isascii() and not any(ch in text for ch in _RE2_UNSAFE_CHARS):
+            return fast(text)
+        return fallback(text)
+    return may_match
+
+
+# Character-class categories that include "\n" (\s, \D, \W and line breaks)
+_NEWLINE_CATEGORIES = frozenset({
+    "CATEGORY_SPACE", "CATEGORY_NOT_DIGIT", "CATEGORY_NOT_WORD", "CATEGORY_LINEBREAK",
+    "CATEGORY_LOC_NOT_WORD", "CATEGORY_UNI_SPACE", "CATEGORY_UNI_NOT_DIGIT",
+    "CATEGORY_UNI_NOT_WORD", "CATEGORY_UNI_LINEBREAK",
+})
+
+
+def _can_match_newline(query: str, flags: int) -> bool:
+    """Whether some part of the regex ``query`` can consume a "\n". Anything
+    not understood counts as yes."""
+    try:
+        parsed = _re_parser.parse(query, flags)
+    except Exception:
+        return True
+    return _items_match_newline(parsed, bool(parsed.state.flags & re.DOTALL))
+
+
+def _items_match_newline(items, dotall: bool) -> bool:
+    for op, av in items:
+        name = op.name
+        if name == "LITERAL":
+            hit = av == 10
+        elif name == "NOT_LITERAL":
+            hit = av != 10
+        elif name == "ANY":
+            hit = dotall
+        elif name == "IN":
+            hit = _set_matches_newline(av)
+        elif name == "SUBPATTERN":
+            _group, add_flags, _del_flags, sub = av
+            hit = _items_match_newline(sub, dotall or bool(add_flags & re.DOTALL))
+        elif name == "BRANCH":
+            hit = any(_items_match_newline(branch, dotall) for branch in av[1])
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+            hit = _items_match_newline(av[2], dotall)
+        elif name == "ATOMIC_GROUP":
+            hit = _items_match_newline(av, dotall)
+        elif name == "GROUPREF_EXISTS":
+            hit = any(_items_match_newline(sub, dotall) for sub in av[1:] if sub is not None)
+        elif name in ("AT", "GROUPREF"):
+            hit = False  # anchors consume nothing; a backreference repeats a group
+        else:
+            hit = True
+        if hit:
+            return True
+    return False
+
+
+def _set_matches_newline(items) -> bool:
+    negated = bool(items) and items[0][0].name == "NEGATE"
+    hit = False
+    for op, av in items[negated:]:
+        name = op.name
+        if name == "LITERAL":
+            hit = av == 10
+        elif name == "RANGE":
+            hit = av[0] <= 10 <= av[1]
+        elif name == "CATEGORY":
+            hit = av.name in _NEWLINE_CATEGORIES
+        else:
+            return True
+        if hit:
+            break
+    return hit != negated
+
+
+def _first_matches(per_file, max_results: int) -> tuple[list[str], int]:
+    """The first ``max_results`` matches of the per-file match iterables,
+    taken in order, and the number of files that consumed."""
+    files_searched = 0
+
+    def matches():
+        nonlocal files_searched
+        for found in per_file:
+            files_searched += 1
+            yield from found
+
+    results = list(itertools.islice(matches(), max_results))
+    return results, files_searched
+
+
+def _map_ahead(pool: ThreadPoolExecutor, fn: Callable, items, window: int):
+    """Like pool.map, but submits lazily, keeping at most ``window`` calls
+    in flight; a consumer that stops early leaves little work behind."""
+    pending: collections.deque = collections.deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _search_with_ripgrep(query: str, search_path: str, file_pattern: str, case_sensitive: bool,
+                         fixed_strings: bool, max_results: int) -> Optional[tuple[list[str], int]]:
+    """Run the search through ripgrep. Returns (result lines, files searched),
+    or None if rg failed — e.g. on regex syntax it doesn't support — so the
+    caller falls back to the Python search."""
+    argv = [_RG, "--max-count", str(max_results)]
+    if file_pattern != "*":
+        argv += ["--glob", file_pattern]
+    argv += _RG_FLAGS  # after the include glob, so the skip lists win
+    if fixed_strings:
+        argv.append("--fixed-strings")
+    if not case_sensitive:
+        argv.append("--ignore-case")
+    argv += ["--", query, search_path]
+
+    found: list[tuple[str, int, str]] = []  # (path, line number, text)
+    matched_files: set[str] = set()
+    files_searched = None
+    try:
+        proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    with proc:
+        for raw in proc.stdout:
+            path, nul, rest = raw.partition(b"\0")
+            if nul:
+                line, _, text = rest.partition(b":")
+                path = os.fsdecode(path)
+                matched_files.add(path)
+                found.append((path, int(line), text.decode("utf-8", errors="replace").rstrip()))
+                if len(found) >= max_results:
+                    proc.kill()
+                    break
+            else:  # the --stats block
+                stat = _RG_FILES_SEARCHED.match(raw.rstrip())
+                if stat:
+                    files_searched = int(stat.group(1))
+
+    # rg searches files in parallel, so they arrive in no fixed order
+    found.sort()
+    results = [f"{path}:{line}: {text}" for path, line, text in found]
+    if len(results) >= max_results:
+        # Stopped early, so there is no summary; count what was seen
+        return results, len(matched_files)
+    if files_searched is None:
+        return None
+    return results, files_searched
+
+
+def _byte_needle(query: str) -> Optional[bytes]:
+    """``query`` as UTF-8, if finding it in a file's raw bytes is exactly
+    finding it in the decoded text: no newlines (decoding normalises them)
+    and no U+FFFD (what undecodable bytes turn into)."""
+    if not query or any(ch in query for ch in "\r\n\ufffd"):
+        return None
+    try:
+        return query.encode("utf-8")
+    except UnicodeEncodeError:  # lone surrogates
+        return None
+
+
+def _mapped_find(fd: int, needle: bytes) -> bool:
+    """False if the file behind ``fd`` is at least _MMAP_MIN_BYTES and its
+    bytes don't contain ``needle``; True otherwise."""
+    try:
+        if os.fstat(fd).st_size < _MMAP_MIN_BYTES:
+            return True
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            return mm.find(needle) != -1
+    except (OSError, ValueError):  # unmappable, or emptied meanwhile
+        return True
+
+
+def _iter_file_matches(filepath, match_fn, may_match=None, needle=None):
+    """Yield a "path:line: text" result for each line of ``filepath`` that
+    ``match_fn`` accepts. Lines are only read as far as the consumer asks."""
     try:
         with open(filepath, "r", encoding="utf-8", errors="replace") as f:
-            for i, line in enumerate(f, 1):
+            if needle is not None and not _mapped_find(f.fileno(), needle):
+                return
+            text = f.read(_WHOLE_FILE_CHARS)
+            if len(text) == _WHOLE_FILE_CHARS:
+                # Too big to hold in memory: stream it line by line
+                f.seek(0)
+                lines = f
+            elif may_match is not None and not may_match(text):
+                return
+            else:
+                lines = io.StringIO(text)  # splits on "\n" only, like f itself
+            for i, line in enumerate(lines, 1):
                 if match_fn(line):
-                    results.append(f"{filepath}:{i}: {line.rstrip()}")
-                    if len(results) >= max_results:
-                        return
+                    yield f"{filepath}:{i}: {line.rstrip()}"
     except (OSError, PermissionError):
         pass
 
@@ -569,23 +989,20 @@ def _find_files(params: dict, working_dir: str) -> dict:
 
     matches: list[str] = []
     max_matches = 100
+    matching = _glob_filter(pattern)
 
-    for root, dirs, files in os.walk(search_path):
-        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
-
+    for root, dirs, files in _walk_tree(search_path, SKIP_DIRS):
         if type_filter in ("directory", "any"):
-            for d in dirs:
-                if fnmatch.fnmatch(d, pattern):
-                    matches.append(os.path.join(root, d) + "/")
-                    if len(matches) >= max_matches:
-                        break
+            for d in matching(dirs):
+                matches.append(os.path.join(root, d) + "/")
+                if len(matches) >= max_matches:
+                    break
 
         if type_filter in ("file", "any"):
-            for f in files:
-                if fnmatch.fnmatch(f, pattern):
-                    matches.append(os.path.join(root, f))
-                    if len(matches) >= max_matches:
-                        break
+            for f in matching(files):
+                matches.append(os.path.join(root, f))
+                if len(matches) >= max_matches:
+                    break
 
         if len(matches) >= max_matches:
             break
@@ -601,6 +1018,9 @@ def _find_files(params: dict, working_dir: str) -> dict:
 
 # ── run_command ─────────────────────────────────────────────────────────────
 
+# Characters of command output passed back to the model
+_COMMAND_OUTPUT_CAP = 20000
+
 
 def _run_command(params: dict, working_dir: str) -> dict:
     command = params["command"]
@@ -611,29 +1031,58 @@ def _run_command(params: dict, working_dir: str) -> dict:
         return {"output": f"Working directory not found: {cwd}", "is_error": True}
 
     try:
-        result = subprocess.run(
+        # On Linux, CPython 3.10+ starts this with vfork, so spawning doesn't
+        # slow down as the agent process grows. Options like preexec_fn,
+        # user, group or umask would force a full fork() — keep them out.
+        proc = subprocess.Popen(
             command,
             shell=True,
             cwd=cwd,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=timeout,
         )
+        # Drain both pipes in the background, holding on to no more of each
+        # than can appear in the output; the rest is only counted
+        drained = [[], []]
+        readers = [
+            threading.Thread(target=_drain_capped, args=(pipe, _COMMAND_OUTPUT_CAP, out), daemon=True)
+            for pipe, out in zip((proc.stdout, proc.stderr), drained)
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            # As subprocess.run does on POSIX: no waiting for the pipes, which
+            # anything the command started may still hold open. The daemon
+            # readers finish whenever they close.
+            proc.kill()
+            proc.wait()
+            raise
+        for reader in readers:
+            reader.join()
+
+        (stdout, stdout_len, stdout_err), (stderr, stderr_len, stderr_err) = drained
+        if stdout_err or stderr_err:
+            raise stdout_err or stderr_err
+
         parts = []
-        if result.stdout:
-            parts.append(result.stdout)
-        if result.stderr:
-            parts.append(f"STDERR:\n{result.stderr}")
-        parts.append(f"\nExit code: {result.returncode}")
+        if stdout:
+            parts.append(stdout)
+        if stderr:
+            parts.append(f"STDERR:\n{stderr}")
+        parts.append(f"\nExit code: {proc.returncode}")
         output = "\n".join(parts)
+        total_len = len(output) + (stdout_len - len(stdout)) + (stderr_len - len(stderr))
 
         # Truncate massive output
-        if len(output) > 20000:
-            output = output[:20000] + f"\n\n… (output truncated, total {len(output)} chars)"
+        if total_len > _COMMAND_OUTPUT_CAP:
+            output = output[:_COMMAND_OUTPUT_CAP] + f"\n\n… (output truncated, total {total_len} chars)"
 
         return {
             "output": output,
-            "is_error": result.returncode != 0,
+            "is_error": proc.returncode != 0,
         }
     except subprocess.TimeoutExpired:
         return {
@@ -644,6 +1093,37 @@ def _run_command(params: dict, working_dir: str) -> dict:
         return {"output": f"Command execution failed: {exc}", "is_error": True}
 
 
+def _drain_capped(pipe, cap: int, out: list):
+    """Read a text-mode pipe to EOF, decoding exactly as ``pipe.read()``
+    would, but keeping only the first ``cap`` characters. Sets ``out`` to
+    [kept text, total length, decode error or None]."""
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(pipe.encoding)(pipe.errors), translate=True
+    )
+    raw = pipe.buffer
+    kept: list[str] = []
+    kept_len = total = 0
+    error = None
+    try:
+        while True:
+            chunk = raw.read1(65536)
+            if error is None:
+                try:
+                    text = decoder.decode(chunk, final=not chunk)
+                except UnicodeDecodeError as exc:
+                    error = exc  # keep draining so the command isn't blocked
+                else:
+                    total += len(text)
+                    if kept_len < cap and text:
+                        kept.append(text[:cap - kept_len])
+                        kept_len += len(kept[-1])
+            if not chunk:
+                break
+    finally:
+        raw.close()
+    out[:] = ["".join(kept), total, error]
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 #  HANDLER DISPATCH MAP
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -665,11 +1145,19 @@ _HANDLERS = {
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+# Bigger Python files are not parsed after an edit: ast.parse holds the GIL
+# and runs at roughly 1-4M characters a second, so this keeps an edit's
+# check to about a quarter of a second at worst
+_PYTHON_CHECK_MAX_CHARS = 250_000
+
+
 def _validate_syntax(filepath: str, content: str) -> str:
     """Run lightweight syntax validation. Returns warning string or empty."""
     ext = os.path.splitext(filepath)[1].lower()
 
     if ext == ".py":
+        if len(content) > _PYTHON_CHECK_MAX_CHARS:
+            return f"skipped (file is over {_PYTHON_CHECK_MAX_CHARS:,} characters)"
         return _validate_python(content)
     if ext == ".json":
         return _validate_json(content)
@@ -7,13 +7,32 @@ All processing is local. Nothing is uploaded.
 """
 
 import os
+import re
 import json
+import logging
 import time
+import threading
+import functools
+import heapq
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import accumulate
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Optional
+
+try:
+    import orjson  # optional: faster config parsing
+except ImportError:
+    orjson = None
+
+try:
+    import ahocorasick  # optional: one pass for all of a file's imports
+except ImportError:
+    ahocorasick = None
 
 from .indexer import (
-    Indexer, IgnoreRules, FileInfo,
+    Indexer, IgnoreRules, FileInfo, Symbol,
     save_index_cache, load_index_cache, detect_language,
 )
 
@@ -51,26 +70,142 @@ _PROJECT_MARKERS = {
 
 def detect_project_types(root: str) -> list[str]:
     """Detect project types from marker files in the root directory."""
-    types = []
     try:
-        entries = set(os.listdir(root))
+        names = os.listdir(root)
     except OSError:
-        return types
+        return []
 
+    # One C-level pass picks out the markers; the loop keeps their order
+    present = _PROJECT_MARKERS.keys() & names
+    types = []
     for marker, ptype in _PROJECT_MARKERS.items():
-        if marker in entries:
-            if ptype not in types:
-                types.append(ptype)
+        if marker in present and ptype not in types:
+            types.append(ptype)
 
     # Check for .sln files (glob)
-    for entry in entries:
-        if entry.endswith(".sln") and "dotnet" not in types:
-            types.append("dotnet")
-            break
+    if "dotnet" not in types and any(name.endswith(".sln") for name in names):
+        types.append("dotnet")
 
     return types
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+#  INDEX LOOKUPS  (derived from the file index on first use)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+_AUTOMATON_MIN_TEXTS = 16
+
+
+class _RelatedFileIndex:
+    """Per-path data find_related_files needs, derived once from the index."""
+
+    def __init__(self, paths: list[str]):
+        self.paths = paths
+        self.stems = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+        self.by_dir: dict[str, list[str]] = {}
+        for path in paths:
+            self.by_dir.setdefault(os.path.dirname(path), []).append(path)
+        # All paths in one string, so a substring is found by str.find in C
+        # rather than tested against each path. NUL can't occur in a path,
+        # so no match spans two of them.
+        self.joined = "\0".join(paths)
+        self.starts: list[int] = []
+        offset = 0
+        for path in paths:
+            self.starts.append(offset)
+            offset += len(path) + 1
+        self.starts.append(offset)  # sentinel: one past the end
+
+    def containing(self, text: str) -> list[str]:
+        """The paths with ``text`` as a substring, in index order."""
+        if not text:
+            return self.paths
+        if "\0" in text:
+            return []
+        found = []
+        pos = self.joined.find(text)
+        while pos != -1:
+            i = bisect_right(self.starts, pos) - 1
+            found.append(self.paths[i])
+            pos = self.joined.find(text, self.starts[i + 1])
+        return found
+
+    def containing_each(self, texts: list[str]) -> Iterable[list[str]]:
+        """``containing`` for each of ``texts``, in order. With pyahocorasick
+        and enough distinct texts, the joined paths are scanned once for all
+        of them (the automaton walks ~10x slower than str.find, so a few
+        finds win); otherwise each is looked up as it's consumed."""
+        words = {text for text in texts if text and "\0" not in text}
+        if ahocorasick is None or len(words) < _AUTOMATON_MIN_TEXTS:
+            return map(self.containing, texts)
+
+        automaton = ahocorasick.Automaton()
+        for word in words:
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+        found: dict[str, list[str]] = {word: [] for word in words}
+        paths, starts = self.paths, self.starts
+        for end, word in automaton.iter(self.joined):
+            path = paths[bisect_right(starts, end - len(word) + 1) - 1]
+            hits = found[word]
+            if not hits or hits[-1] != path:
+                hits.append(path)
+        return [found[text] if text in found else self.containing(text) for text in texts]
+
+
+class _SymbolSearch:
+    """Every indexed symbol's lowercased name, derived once from the index,
+    laid out for substring search the same way as _RelatedFileIndex."""
+
+    def __init__(self, index: dict[str, FileInfo]):
+        self.paths = list(index)
+        self.symbols = [sym for info in index.values() for sym in info.symbols]
+        # file_starts[i]: position in self.symbols of file i's first symbol
+        self.file_starts = [0, *accumulate(len(info.symbols) for info in index.values())]
+        names = [sym.name.lower() for sym in self.symbols]
+        self.joined = "\0".join(names)
+        self.starts = [0, *accumulate(len(name) + 1 for name in names)]
+
+    def matching(self, query_lower: str, limit: int) -> list[tuple[str, Symbol]]:
+        """The first ``limit`` (rel_path, symbol) pairs whose lowercased name
+        contains ``query_lower``, in index order."""
+        if "\0" in query_lower:
+            return []
+        found = []
+        if not query_lower:
+            hits = range(min(limit, len(self.symbols)))
+        else:
+            hits = []
+            pos = self.joined.find(query_lower)
+            while pos != -1 and len(hits) < limit:
+                i = bisect_right(self.starts, pos) - 1
+                hits.append(i)
+                pos = self.joined.find(query_lower, self.starts[i + 1])
+        for i in hits:
+            found.append((self.paths[bisect_right(self.file_starts, i) - 1], self.symbols[i]))
+        return found
+
+    def matching_regex(self, pattern: re.Pattern, limit: int) -> list[tuple[str, Symbol]]:
+        """The first ``limit`` (rel_path, symbol) pairs whose name ``pattern``
+        finds a match in, in index order."""
+        found = []
+        for file_no, path in enumerate(self.paths):
+            for i in range(self.file_starts[file_no], self.file_starts[file_no + 1]):
+                sym = self.symbols[i]
+                if pattern.search(sym.name):
+                    found.append((path, sym))
+                    if len(found) == limit:
+                        return found
+        return found
+
+
+@functools.lru_cache(maxsize=256)
+def _symbol_query_regex(query: str) -> re.Pattern:
+    """Symbol queries repeat (e.g. while typing), so each compiles once."""
+    return re.compile(query, re.IGNORECASE)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 #  WORKSPACE CONFIG  (reads .localai/config.json)
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -85,24 +220,29 @@ class WorkspaceConfig:
     auto_validate: bool = True           # run validation after edits
     confirm_large_edits: bool = True     # ask before large edits
     large_edit_threshold: int = 50       # lines changed = "large"
+    content_cache_files: int = 256       # file contents kept in memory
+    content_cache_mb: int = 64           # ... and their total size (MB of text)
 
 
-def load_workspace_config(root: str) -> WorkspaceConfig:
-    """Load workspace config from .localai/config.json, falling back to defaults."""
-    config_path = os.path.join(root, ".localai", "config.json")
+def load_workspace_config(root: str, localai_dir: Optional[str] = None) -> WorkspaceConfig:
+    """Load workspace config from .localai/config.json, falling back to defaults.
+    ``localai_dir`` is the already-joined ``root/.localai``, if the caller has it."""
+    config_path = os.path.join(localai_dir or os.path.join(root, ".localai"), "config.json")
     cfg = WorkspaceConfig()
 
-    if not os.path.isfile(config_path):
-        return cfg
-
+    # No separate existence check: a missing file (or a directory in its
+    # place) fails the open, saving a stat round trip on network drives
     try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except (OSError, json.JSONDecodeError):
+        with open(config_path, "rb") as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except (OSError, ValueError):
+        return cfg
+    if not isinstance(data, dict):
         return cfg
 
     for key in ("max_file_size", "max_context_files", "max_context_tokens",
-                "large_edit_threshold"):
+                "large_edit_threshold", "content_cache_files", "content_cache_mb"):
         if key in data and isinstance(data[key], int):
             setattr(cfg, key, data[key])
     for key in ("auto_validate", "confirm_large_edits"):
@@ -112,16 +252,85 @@ def load_workspace_config(root: str) -> WorkspaceConfig:
     return cfg
 
 
-def load_workspace_rules(root: str) -> str:
-    """Load user-defined AI behavior rules from .localai/rules.md."""
-    rules_path = os.path.join(root, ".localai", "rules.md")
-    if not os.path.isfile(rules_path):
+# rules_path -> ((mtime_ns, size), rules) as last read
+_RULES_CACHE: dict[str, tuple[tuple[int, int], str]] = {}
+
+
+def load_workspace_rules(root: str, localai_dir: Optional[str] = None) -> str:
+    """Load user-defined AI behavior rules from .localai/rules.md. Rules
+    read before are reused while the file's mtime and size are unchanged,
+    so reopening a workspace costs one stat."""
+    rules_path = os.path.join(localai_dir or os.path.join(root, ".localai"), "rules.md")
+    try:
+        st = os.stat(rules_path)
+    except OSError:
+        _RULES_CACHE.pop(rules_path, None)
         return ""
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _RULES_CACHE.get(rules_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
     try:
         with open(rules_path, "r", encoding="utf-8", errors="replace") as f:
-            return f.read(8000)  # cap at 8KB to avoid bloating context
+            rules = f.read(8000)  # cap at 8KB to avoid bloating context
     except OSError:
         return ""
+    _RULES_CACHE[rules_path] = (stamp, rules)
+    return rules
+
+
+def _read_text(abs_path: str) -> Optional[tuple[str, tuple[int, int]]]:
+    """A file's text and its (mtime_ns, size) as of the read, or None if it
+    can't be read."""
+    try:
+        with open(abs_path, "r", encoding="utf-8", errors="replace") as f:
+            st = os.fstat(f.fileno())
+            return f.read(), (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  INDEX CACHE WRITES  (off the caller's thread)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# One writer, so saves never overlap. Its thread is joined at interpreter
+# exit after the queued saves have run, so a save still lands on disk.
+_INDEX_CACHE_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-cache")
+_PENDING_SAVES: dict[str, dict[str, FileInfo]] = {}  # root -> newest unsaved index
+_LAST_SAVES: dict[str, Future] = {}                   # root -> most recently queued save
+_SAVES_LOCK = threading.Lock()
+_log = logging.getLogger(__name__)
+
+
+def _save_index_cache_later(root: str, index: dict[str, FileInfo]):
+    """Queue save_index_cache(root, index) and return at once. Saves asked
+    for while an earlier one for the root is still queued are coalesced:
+    only the newest index is written."""
+    with _SAVES_LOCK:
+        queued = root in _PENDING_SAVES
+        _PENDING_SAVES[root] = index
+        if not queued:
+            _LAST_SAVES[root] = _INDEX_CACHE_WRITER.submit(_write_pending_index, root)
+
+
+def _write_pending_index(root: str):
+    with _SAVES_LOCK:
+        index = _PENDING_SAVES.pop(root)
+    # Best effort, as when saves ran inline: a failure here must not be
+    # re-raised later by _wait_for_index_cache in an unrelated open()
+    try:
+        save_index_cache(root, index)
+    except Exception as exc:
+        _log.warning("Could not save the index cache for %s: %s", root, exc)
+
+
+def _wait_for_index_cache(root: str):
+    """Block until any queued save of ``root``'s index cache is written."""
+    with _SAVES_LOCK:
+        pending = _LAST_SAVES.pop(root, None)
+    if pending is not None:
+        pending.result()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -133,17 +342,26 @@ class Workspace:
     """Represents an opened project folder with indexed file metadata."""
 
     def __init__(self, root: str):
-        self.root = os.path.normpath(os.path.abspath(root))
-        self.config = load_workspace_config(self.root)
-        self.rules = load_workspace_rules(self.root)
+        self.root = os.path.abspath(root)  # abspath already normalizes
+        self._localai_dir = os.path.join(self.root, ".localai")
+        self.config = load_workspace_config(self.root, self._localai_dir)
+        self.rules = load_workspace_rules(self.root, self._localai_dir)
         self.ignore = IgnoreRules(self.root)
         self.project_types: list[str] = []
         self.index: dict[str, FileInfo] = {}
         self.languages: dict[str, int] = {}    # language -> file count
+        self.symbol_index: dict[str, list[str]] = {}  # lowercased symbol name -> rel_paths
+        self.mention_index: dict[str, list[tuple[str, bool]]] = {}  # name/path -> (rel_path, is_full_path)
+        self.mention_lengths: tuple[int, ...] = ()
         self.total_files: int = 0
         self.total_lines: int = 0
         self.scan_time: float = 0.0
-        self._file_content_cache: dict[str, str] = {}
+        # rel_path -> (content, abs_path, (mtime_ns, size)), least recently used first
+        self._file_content_cache: dict[str, tuple[str, str, tuple[int, int]]] = {}
+        self._cached_chars = 0
+        self._structure_cache: dict[int, str] = {}  # max_lines -> summary
+        self._related_index: Optional[_RelatedFileIndex] = None
+        self._symbol_search: Optional[_SymbolSearch] = None
 
     # ── Open & Analyze ──────────────────────────────────────────────────────
 
@@ -151,33 +369,51 @@ class Workspace:
         """Open the workspace: detect project type, scan and index all files."""
         self.project_types = detect_project_types(self.root)
         indexer = Indexer(self.root, self.ignore, self.config.max_file_size)
+        # Don't read a cache another Workspace on this root is still writing
+        _wait_for_index_cache(self.root)
 
         t0 = time.time()
         self.index = indexer.scan()
         self.scan_time = time.time() - t0
 
         self._compute_stats()
-        save_index_cache(self.root, self.index)
+        if not indexer.cache_current:
+            _save_index_cache_later(self.root, self.index)
 
     def refresh(self):
         """Incremental rescan — only re-index changed files."""
         indexer = Indexer(self.root, self.ignore, self.config.max_file_size)
-        self.index, changed, removed = indexer.rescan_changed(self.index)
-        self._compute_stats()
+        old_index = self.index
+        self.index, changed, removed = indexer.rescan_changed(old_index)
+        # Same files with the same contents: the stats, derived indexes and
+        # structure summaries all still hold. Otherwise only the files that
+        # differ are folded in (a file can also leave the index without being
+        # "removed", by growing past max_file_size).
+        if changed or removed or len(self.index) != len(old_index):
+            gone = [p for p in old_index if p not in self.index]
+            self._apply_delta(
+                [old_index[p] for p in changed if p in old_index] + [old_index[p] for p in gone],
+                [self.index[p] for p in changed],
+            )
 
         # Invalidate cache for changed files
         for rel in changed + removed:
-            self._file_content_cache.pop(rel, None)
+            self._drop_file_content(rel)
 
         if changed or removed:
-            save_index_cache(self.root, self.index)
+            _save_index_cache_later(self.root, self.index)
 
         return changed, removed
 
     # ── Queries ─────────────────────────────────────────────────────────────
 
     def get_structure_summary(self, max_lines: int = 200) -> str:
-        """Generate a compact project structure string for AI context injection."""
+        """Generate a compact project structure string for AI context injection.
+        Cached until the next open/refresh recomputes the index stats."""
+        cached = self._structure_cache.get(max_lines)
+        if cached is not None:
+            return cached
+
         lines = []
         lines.append(f"Project: {os.path.basename(self.root)}")
         if self.project_types:
@@ -193,29 +429,29 @@ class Workspace:
         tree_lines = self._build_tree(max_lines - len(lines))
         lines.extend(tree_lines)
 
-        return "\n".join(lines[:max_lines])
+        summary = "\n".join(lines[:max_lines])
+        self._structure_cache[max_lines] = summary
+        return summary
 
     def get_file_content(self, rel_path: str) -> Optional[str]:
-        """Read a file's content with caching (avoids re-reads)."""
-        if rel_path in self._file_content_cache:
-            return self._file_content_cache[rel_path]
+        """Read a file's content with caching (avoids re-reads). A cached copy
+        is used while the file's mtime and size are unchanged; the cache keeps
+        the most recently used files within the configured limits."""
+        content = self._cached_content(rel_path)
+        if content is not None:
+            return content
 
         info = self.index.get(rel_path)
         if not info:
             return None
-
-        try:
-            with open(info.abs_path, "r", encoding="utf-8", errors="replace") as f:
-                content = f.read()
-        except (OSError, PermissionError):
+        read = _read_text(info.abs_path)
+        if read is None:
             return None
-
-        self._file_content_cache[rel_path] = content
-        return content
+        return self._cache_content(rel_path, info.abs_path, read)
 
     def invalidate_cache(self, rel_path: str):
         """Remove a file from the content cache after it's been modified."""
-        self._file_content_cache.pop(rel_path, None)
+        self._drop_file_content(rel_path)
 
     def find_related_files(self, rel_path: str) -> list[str]:
         """Find files related to the given file via imports and naming patterns."""
@@ -223,71 +459,229 @@ class Workspace:
         if not info:
             return []
 
-        related: list[str] = []
-        basename = os.path.splitext(os.path.basename(rel_path))[0]
+        if self._related_index is None:
+            self._related_index = _RelatedFileIndex(list(self.index))
+        lookup = self._related_index
 
-        # 1. Files referenced in imports
-        for imp in info.imports:
-            # Convert import path to potential file matches
-            imp_clean = imp.replace(".", "/").replace("@", "").strip()
-            for candidate_path, candidate_info in self.index.items():
-                cand_no_ext = os.path.splitext(candidate_path)[0].replace("\\", "/")
-                if cand_no_ext.endswith(imp_clean) or imp_clean in candidate_path:
-                    if candidate_path != rel_path and candidate_path not in related:
-                        related.append(candidate_path)
+        limit = self.config.max_context_files
+        related: list[str] = []
+        seen = {rel_path}
+
+        def add(paths) -> bool:
+            """Append the paths not seen yet; True once ``limit`` are in."""
+            for path in paths:
+                if path not in seen:
+                    seen.add(path)
+                    related.append(path)
+                    if len(related) == limit:
+                        return True
+            return False
+
+        # 1. Files referenced in imports. A path whose extension-less form
+        # ends with the import also contains it, so one substring test covers
+        # both ways an import can name a file.
+        # Convert import paths to potential file matches
+        imports = [imp.replace(".", "/").replace("@", "").strip() for imp in info.imports]
+        for paths in lookup.containing_each(imports):
+            if add(paths):
+                return related
 
         # 2. Files with the same base name (e.g., foo.py ↔ test_foo.py, foo.test.ts)
-        for other_path in self.index:
-            if other_path == rel_path:
-                continue
-            other_base = os.path.splitext(os.path.basename(other_path))[0]
-            if (basename in other_base or other_base in basename) and len(basename) > 2:
-                if other_path not in related:
-                    related.append(other_path)
+        basename = os.path.splitext(os.path.basename(rel_path))[0]
+        if len(basename) > 2 and add(
+            other_path for other_path, other_base in zip(lookup.paths, lookup.stems)
+            if basename in other_base or other_base in basename
+        ):
+            return related
 
         # 3. Files in the same directory
-        my_dir = os.path.dirname(rel_path)
-        for other_path in self.index:
-            if other_path == rel_path:
-                continue
-            if os.path.dirname(other_path) == my_dir and other_path not in related:
-                related.append(other_path)
+        add(lookup.by_dir.get(os.path.dirname(rel_path), ()))
 
-        return related[:self.config.max_context_files]
+        return related[:limit]
 
-    def search_symbols(self, query: str) -> list[tuple[str, str]]:
-        """Search for symbols matching query across all indexed files.
+    def search_symbols(self, query: str, regex: bool = False) -> list[tuple[str, str]]:
+        """Search for symbols matching query across all indexed files: a
+        case-insensitive substring of the name, or with ``regex`` a
+        case-insensitive regular expression (re.error if it is invalid).
         Returns [(rel_path, "kind:name:line"), ...]."""
-        query_lower = query.lower()
-        results = []
-        for rel_path, info in self.index.items():
-            for sym in info.symbols:
-                if query_lower in sym.name.lower():
-                    results.append((rel_path, f"{sym.kind}:{sym.name}:{sym.line}"))
-        return results[:100]
+        if self._symbol_search is None:
+            self._symbol_search = _SymbolSearch(self.index)
+        if regex:
+            found = self._symbol_search.matching_regex(_symbol_query_regex(query), 100)
+        else:
+            found = self._symbol_search.matching(query.lower(), 100)
+        return [(rel_path, f"{sym.kind}:{sym.name}:{sym.line}") for rel_path, sym in found]
 
     # ── Internal ────────────────────────────────────────────────────────────
 
+    def _cached_content(self, rel_path: str) -> Optional[str]:
+        """The cached content of ``rel_path`` if the file is unchanged since
+        (marking it most recently used), else None."""
+        cached = self._file_content_cache.pop(rel_path, None)
+        if cached is None:
+            return None
+        content, abs_path, signature = cached
+        try:
+            st = os.stat(abs_path)
+            if (st.st_mtime_ns, st.st_size) == signature:
+                self._file_content_cache[rel_path] = cached
+                return content
+        except OSError:
+            pass
+        self._cached_chars -= len(content)
+        return None
+
+    def _cache_content(self, rel_path: str, abs_path: str, read: tuple[str, tuple[int, int]]) -> str:
+        content, signature = read
+        self._file_content_cache[rel_path] = (content, abs_path, signature)
+        self._cached_chars += len(content)
+        self._evict_file_contents()
+        return content
+
+    def _drop_file_content(self, rel_path: str):
+        cached = self._file_content_cache.pop(rel_path, None)
+        if cached is not None:
+            self._cached_chars -= len(cached[0])
+
+    def _evict_file_contents(self):
+        """Drop least recently used contents until the cache is within its
+        limits; the newest entry stays even if it alone is over."""
+        cache = self._file_content_cache
+        max_files = self.config.content_cache_files
+        max_chars = self.config.content_cache_mb * 1_000_000
+        while len(cache) > 1 and (len(cache) > max_files or self._cached_chars > max_chars):
+            self._drop_file_content(next(iter(cache)))
+
     def _compute_stats(self):
+        self._structure_cache.clear()
+        self._related_index = None
+        self._symbol_search = None
         self.total_files = len(self.index)
         self.total_lines = sum(info.line_count for info in self.index.values())
+        # Counted in C, then the few distinct unknowns ("" / None) folded into
+        # "other"; the result keeps first-seen order like the per-file loop
         self.languages = {}
-        for info in self.index.values():
+        for lang, count in Counter([info.language for info in self.index.values()]).items():
+            lang = lang or "other"
+            self.languages[lang] = self.languages.get(lang, 0) + count
+        self._build_symbol_index()
+        self._build_mention_index()
+
+    def _apply_delta(self, old_infos: list[FileInfo], new_infos: list[FileInfo]):
+        """Update the stats and derived indexes for a refresh: ``old_infos``
+        are the replaced / departed entries, ``new_infos`` their replacements
+        and the newly added files. Languages that first appear here are
+        listed last, which only affects the order of equal counts."""
+        self._structure_cache.clear()
+        self._related_index = None
+        self._symbol_search = None
+        self.total_files = len(self.index)
+        self.total_lines += (sum(info.line_count for info in new_infos)
+                             - sum(info.line_count for info in old_infos))
+
+        languages = self.languages
+        for info in old_infos:
+            lang = info.language or "other"
+            languages[lang] -= 1
+            if not languages[lang]:
+                del languages[lang]
+        for info in new_infos:
             lang = info.language or "other"
-            self.languages[lang] = self.languages.get(lang, 0) + 1
+            languages[lang] = languages.get(lang, 0) + 1
+
+        # Lookups only ever collect these lists into sets, so entries can be
+        # removed and appended without keeping them in index order
+        symbol_index = self.symbol_index
+        for info in old_infos:
+            for name in {sym.name.lower() for sym in info.symbols if len(sym.name) > 2}:
+                paths = symbol_index.get(name)
+                if paths and info.rel_path in paths:
+                    paths.remove(info.rel_path)
+                    if not paths:
+                        del symbol_index[name]
+        for info in new_infos:
+            for name in {sym.name.lower() for sym in info.symbols if len(sym.name) > 2}:
+                symbol_index.setdefault(name, []).append(info.rel_path)
+
+        # A changed file keeps its path, so only files that left or joined the
+        # index move in the mention index
+        kept = {info.rel_path for info in old_infos} & {info.rel_path for info in new_infos}
+        mention_index = self.mention_index
+        keys_changed = False
+        for info in old_infos:
+            if info.rel_path in kept:
+                continue
+            for key, entry in self._mention_entries(info):
+                entries = mention_index.get(key)
+                if entries and entry in entries:
+                    entries.remove(entry)
+                    if not entries:
+                        del mention_index[key]
+                        keys_changed = True
+        for info in new_infos:
+            if info.rel_path in kept:
+                continue
+            for key, entry in self._mention_entries(info):
+                if key not in mention_index:
+                    keys_changed = True
+                mention_index.setdefault(key, []).append(entry)
+        if keys_changed:
+            self.mention_lengths = tuple(sorted({len(key) for key in mention_index}))
+
+    def _build_symbol_index(self):
+        """Map each lowercased symbol name (> 2 chars) to the files defining it."""
+        symbol_index: dict[str, list[str]] = {}
+        for rel_path, info in self.index.items():
+            for sym in info.symbols:
+                if len(sym.name) > 2:
+                    paths = symbol_index.setdefault(sym.name.lower(), [])
+                    if not paths or paths[-1] != rel_path:
+                        paths.append(rel_path)
+        self.symbol_index = symbol_index
+
+    def _build_mention_index(self):
+        """Map every lowercased basename, stem and relative path to its files,
+        so direct mentions can be found by looking up instruction substrings."""
+        mention_index: dict[str, list[tuple[str, bool]]] = {}
+        for rel_path, info in self.index.items():
+            mention_index.setdefault(info.basename_lower, []).append((rel_path, False))
+            if info.stem_lower != info.basename_lower:
+                mention_index.setdefault(info.stem_lower, []).append((rel_path, False))
+            mention_index.setdefault(info.rel_path_lower, []).append((rel_path, True))
+        self.mention_index = mention_index
+        self.mention_lengths = tuple(sorted({len(key) for key in mention_index}))
+
+    @staticmethod
+    def _mention_entries(info: FileInfo) -> list[tuple[str, tuple[str, bool]]]:
+        """The (key, entry) pairs a file contributes to the mention index,
+        as _build_mention_index adds them."""
+        rel_path = info.rel_path
+        entries = [(info.basename_lower, (rel_path, False))]
+        if info.stem_lower != info.basename_lower:
+            entries.append((info.stem_lower, (rel_path, False)))
+        entries.append((info.rel_path_lower, (rel_path, True)))
+        return entries
 
     def _build_tree(self, max_lines: int) -> list[str]:
-        """Build a compact directory tree from the index."""
+        """Build a compact directory tree from the index.
+
+        Every directory shown takes at least one line, so only the first
+        ``max_lines`` directories (and the first few files of each) are
+        ever sorted, however large the index is.
+        """
         dirs: dict[str, list[str]] = {}
-        for rel_path in sorted(self.index.keys()):
-            parent = os.path.dirname(rel_path) or "."
-            filename = os.path.basename(rel_path)
-            if parent not in dirs:
-                dirs[parent] = []
-            dirs[parent].append(filename)
+        for rel_path in self.index:
+            parent, _, filename = rel_path.rpartition("/")
+            dirs.setdefault(parent or ".", []).append(filename)
+
+        dir_count = max(max_lines, 1)
+        if len(dirs) > dir_count:
+            shown_dirs = heapq.nsmallest(dir_count, dirs)
+        else:
+            shown_dirs = sorted(dirs)
 
         lines = []
-        for dir_path in sorted(dirs.keys()):
+        for dir_path in shown_dirs:
             if len(lines) >= max_lines:
                 lines.append("  ... (truncated)")
                 break
@@ -301,10 +695,10 @@ class Workspace:
 
             # Show files, collapse if too many
             if len(files) <= 8:
-                for f in files:
+                for f in sorted(files):
                     lines.append(f"{prefix}{f}")
             else:
-                for f in files[:4]:
+                for f in heapq.nsmallest(4, files):
                     lines.append(f"{prefix}{f}")
                 lines.append(f"{prefix}... +{len(files) - 4} more files")
 
@@ -335,9 +729,15 @@ def init_workspace_config(root: str):
             "auto_validate": True,
             "confirm_large_edits": True,
             "large_edit_threshold": 50,
+            "content_cache_files": 256,
+            "content_cache_mb": 64,
         }
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump(default_config, f, indent=2)
+        if orjson is not None:
+            with open(config_path, "wb") as f:
+                f.write(orjson.dumps(default_config, option=orjson.OPT_INDENT_2))
+        else:
+            with open(config_path, "w", encoding="utf-8") as f:
+                json.dump(default_config, f, indent=2)
 
     # rules.md
     rules_path = os.path.join(localai_dir, "rules.md")
@@ -0,0 +1,60 @@
+# Copyright (c) 2026 — See LICENSE file for details.
+"""Regression tests for the indexer's threaded scan."""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from coding_agent import indexer
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SOURCES = {
+    ".py": "import os\nclass C{i}:\n    pass\ndef f{i}():\n    pass\n",
+    ".js": "import x from './m{i}'\nclass C{i} {{}}\nfunction f{i}() {{}}\n",
+    ".go": "package x\ntype S{i} struct {{}}\nfunc F{i}() {{}}\n",
+    ".rs": "use std::io;\nstruct S{i};\nfn f{i}() {{}}\n",
+    ".java": "import java.util.List;\npublic class C{i} {{\n}}\ninterface I{i} {{}}\n",
+}
+
+# Scans in a fresh interpreter, so the first use of the pattern tables happens
+# while the pool is running; a tiny switch interval makes the threads interleave
+_THREADED_SCAN = """
+import json, sys
+sys.setswitchinterval(1e-6)
+from coding_agent.indexer import Indexer
+index = Indexer(sys.argv[1]).scan(use_cache=False)
+print(json.dumps({rel: [[[s.kind, s.name, s.line] for s in info.symbols], info.imports]
+                  for rel, info in index.items()}))
+"""
+
+
+class ThreadedScanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        exts = list(_SOURCES)
+        for i in range(400):
+            ext = exts[i % len(exts)]
+            with open(os.path.join(self.tmp.name, f"f{i}{ext}"), "w", encoding="utf-8") as f:
+                f.write(_SOURCES[ext].format(i=i))
+
+    def test_threaded_scan_matches_sequential(self):
+        with mock.patch.object(indexer, "_PARALLEL_MIN_FILES", sys.maxsize):
+            index = indexer.Indexer(self.tmp.name).scan(use_cache=False)
+        expected = {rel: [[[s.kind, s.name, s.line] for s in info.symbols], info.imports]
+                    for rel, info in index.items()}
+        self.assertEqual(sum(len(symbols) for symbols, _ in expected.values()), 800)
+
+        for _ in range(3):
+            proc = subprocess.run([sys.executable, "-c", _THREADED_SCAN, self.tmp.name],
+                                  capture_output=True, text=True, cwd=_PACKAGE_DIR, check=True)
+            self.assertEqual(json.loads(proc.stdout), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# Copyright (c) 2026 — See LICENSE file for details.
+"""Regression tests for search_files: the whole-file pre-check and ripgrep."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from coding_agent import tools
+
+
+class WholeFilePrecheckTest(unittest.TestCase):
+    """The pre-check must never reject a file that has a matching line."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        with open(os.path.join(self.tmp.name, "f.txt"), "w", encoding="utf-8") as f:
+            f.write("hello world\nlast")
+
+    def matching_lines(self, query: str) -> list[str]:
+        with mock.patch.object(tools, "_RG", None):  # the Python search path
+            output = tools._search_files({"query": query, "path": self.tmp.name}, self.tmp.name)["output"]
+        return [line.split(":", 2)[1] for line in output.splitlines() if "f.txt:" in line]
+
+    def test_newline_then_end_of_line(self):
+        # A line keeps its "\n", so $ also holds after it
+        for query in (r"d\s$", r"\s$", r"\n$"):
+            with self.subTest(query=query):
+                self.assertEqual(self.matching_lines(query), ["1"])
+
+    def test_end_of_line(self):
+        self.assertEqual(self.matching_lines("d$"), ["1"])
+        self.assertEqual(self.matching_lines("t$"), ["2"])
+        self.assertEqual(self.matching_lines(r"[^\n]+$"), ["1", "2"])
+
+
+class RipgrepRoutingTest(unittest.TestCase):
+    """Syntax that rg and re read differently must not be sent to rg."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        with open(os.path.join(self.tmp.name, "f.txt"), "w", encoding="utf-8") as f:
+            f.write("d]\n5\n")
+
+    def test_posix_class_uses_python_search(self):
+        # To re, [[:digit:]] is the set "[:digt" followed by "]"
+        params = {"query": "[[:digit:]]", "path": self.tmp.name}
+        with mock.patch.object(tools, "_RG", "rg"), \
+                mock.patch.object(tools, "_search_with_ripgrep") as ripgrep:
+            output = tools._search_files(params, self.tmp.name)["output"]
+        ripgrep.assert_not_called()
+        self.assertIn("f.txt:1: d]", output)
+        self.assertNotIn("f.txt:2:", output)
+
+    def test_fixed_strings_still_use_rg(self):
+        params = {"query": "[:", "path": self.tmp.name, "fixed_strings": True}
+        with mock.patch.object(tools, "_RG", "rg"), \
+                mock.patch.object(tools, "_search_with_ripgrep", return_value=None) as ripgrep:
+            tools._search_files(params, self.tmp.name)
+        ripgrep.assert_called_once()
+
+
+@unittest.skipUnless(tools._RG, "rg is not installed")
+class RipgrepTest(unittest.TestCase):
+    """Below the result cap, rg must report what the Python search does."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for rel, text in (("b.py", "foo = 1\r\nbar: foo\n"), ("a/c.txt", "no\nfoo\n"),
+                          (".hidden/d.md", "FOO\n"), ("node_modules/e.js", "foo\n"), ("f.txt", "none\n"),
+                          ("g.txt", "\0foo\n")):
+            path = os.path.join(self.tmp.name, *rel.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+
+    def search(self, use_rg: bool, **params) -> tuple[str, list[str]]:
+        with mock.patch.object(tools, "_RG", tools._RG if use_rg else None):
+            output = tools._search_files(params, self.tmp.name)["output"]
+        header, _, body = output.partition("\n\n")
+        return header, sorted(body.splitlines())
+
+    def test_matches_python_search(self):
+        for params in ({"query": "foo"}, {"query": "foo", "case_sensitive": True},
+                       {"query": "o$"}, {"query": "foo", "file_pattern": "*.py"}):
+            with self.subTest(**params):
+                self.assertEqual(self.search(True, **params), self.search(False, **params))
+
+    def test_does_not_fall_back(self):
+        found = tools._search_with_ripgrep("foo", self.tmp.name, "*", False, False, 200)
+        self.assertIsNotNone(found)
+        results, files_searched = found
+        self.assertEqual(files_searched, 5)  # node_modules is skipped
+        self.assertEqual(results, sorted(results))
+
+
+if __name__ == "__main__":
+    unittest.main()